@@ -6,9 +6,14 @@ This script creates a simple app icon (AppIcon.icns) for macOS
 
 import os
 import sys
+import shutil
+import struct
+import hashlib
 import subprocess
 from pathlib import Path
 import tempfile
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from PIL import Image, ImageDraw, ImageFont
@@ -23,31 +28,65 @@ BG_COLOR = (18, 18, 18)  # Dark background
 FG_COLOR = (0, 230, 118)  # Green text
 ICON_TEXT = "SC2"  # Text to display in the icon
 
-def create_temp_iconset():
-    """Create a temporary iconset directory with all required sizes."""
-    temp_dir = tempfile.mkdtemp()
-    iconset_path = Path(temp_dir) / "AppIcon.iconset"
-    iconset_path.mkdir()
-    
-    # Create base icon image
-    img = Image.new('RGB', (ICON_SIZE, ICON_SIZE), color=BG_COLOR)
-    draw = ImageDraw.Draw(img)
-    
-    # Try to use a font if available, otherwise use default
+# ICNS element types for PNG payloads, keyed by iconset file name
+ICNS_TYPES = {
+    "icon_16x16.png": b"icp4",
+    "icon_16x16@2x.png": b"ic11",
+    "icon_32x32.png": b"icp5",
+    "icon_32x32@2x.png": b"ic12",
+    "icon_64x64.png": b"icp6",
+    "icon_128x128.png": b"ic07",
+    "icon_128x128@2x.png": b"ic13",
+    "icon_256x256.png": b"ic08",
+    "icon_256x256@2x.png": b"ic14",
+    "icon_512x512.png": b"ic09",
+    "icon_512x512@2x.png": b"ic10",
+}
+
+# Rendered text layers are cached here so later runs skip rasterization
+TEXT_CACHE_DIR = Path(os.path.dirname(os.path.abspath(__file__))) / ".cache"
+
+@lru_cache(maxsize=8)
+def load_font(font_size):
+    """Load the icon font at font_size, returning (font, effective_size).
+
+    Cached so repeated icon renders in one process don't search for and
+    parse the TTF again.
+    """
+    for font_path in ("Arial Bold.ttf", "/System/Library/Fonts/Supplemental/Arial Bold.ttf"):
+        try:
+            return ImageFont.truetype(font_path, font_size), font_size
+        except OSError:
+            continue
+    # The default bitmap font is drawn at a smaller nominal size
+    return ImageFont.load_default(), int(ICON_SIZE * 0.3)
+
+def render_text_layer():
+    """Return ICON_TEXT drawn on a transparent ICON_SIZE layer, cached on disk.
+
+    The cache key includes the resolved font file and its mtime, so a
+    changed or newly installed font is rendered again.
+    """
+    font, font_size = load_font(int(ICON_SIZE * 0.45))
+    # Pillow's built-in default font has no file (or an in-memory one)
+    font_path = getattr(font, 'path', None)
+    if not isinstance(font_path, (str, os.PathLike)):
+        font_path = None
     try:
-        # Try to find a good font - system dependent
-        font_size = int(ICON_SIZE * 0.45)
+        font_mtime = os.path.getmtime(font_path) if font_path else 0
+    except OSError:
+        font_mtime = 0
+    key_text = f"{ICON_TEXT}|{FG_COLOR}|{ICON_SIZE}|{font_path}|{font_mtime}"
+    key = hashlib.blake2b(key_text.encode(), digest_size=6).hexdigest()
+    cache_path = TEXT_CACHE_DIR / f"sc2_icon_text_{key}.png"
+    if cache_path.exists():
         try:
-            font = ImageFont.truetype("Arial Bold.ttf", font_size)
-        except:
-            try:
-                font = ImageFont.truetype("/System/Library/Fonts/Supplemental/Arial Bold.ttf", font_size)
-            except:
-                font = ImageFont.load_default()
-                font_size = int(ICON_SIZE * 0.3)  # Smaller size for default font
-    except:
-        font = ImageFont.load_default()
-        font_size = int(ICON_SIZE * 0.3)  # Smaller size for default font
+            return Image.open(cache_path).convert('RGBA')
+        except OSError:
+            pass  # Unreadable cache entry - render again below
+
+    layer = Image.new('RGBA', (ICON_SIZE, ICON_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
     
     # Calculate text position to center it
     text_width = font.getlength(ICON_TEXT) if hasattr(font, 'getlength') else font_size * len(ICON_TEXT) * 0.6
@@ -56,6 +95,27 @@ def create_temp_iconset():
     
     # Draw text
     draw.text((text_x, text_y), ICON_TEXT, font=font, fill=FG_COLOR)
+
+    try:
+        TEXT_CACHE_DIR.mkdir(exist_ok=True)
+        layer.save(cache_path)
+    except OSError:
+        pass  # Caching is best effort
+    return layer
+
+def create_temp_iconset():
+    """Create a temporary iconset directory with all required sizes."""
+    temp_dir = tempfile.mkdtemp()
+    iconset_path = Path(temp_dir) / "AppIcon.iconset"
+    iconset_path.mkdir()
+    
+    # Create base icon image
+    img = Image.new('RGB', (ICON_SIZE, ICON_SIZE), color=BG_COLOR)
+    
+    # Paste the (possibly cached) text layer, using its alpha as the mask
+    text_layer = render_text_layer()
+    img.paste(text_layer, (0, 0), text_layer)
+    draw = ImageDraw.Draw(img)
     
     # Draw a circular background
     circle_margin = int(ICON_SIZE * 0.1)
@@ -64,19 +124,54 @@ def create_temp_iconset():
     
     # Generate all required sizes for macOS
     icon_sizes = [16, 32, 64, 128, 256, 512, 1024]
+
+    # Resize once per unique side length; @2x variants share images with the
+    # regular sizes and the base size needs no resize at all.
+    # Sizes are built largest first as a halving pyramid so each Lanczos pass
+    # reads the previous (2x) level instead of the full 1024px master.
+    unique_sizes = set(icon_sizes) | {size * 2 for size in icon_sizes if size * 2 <= ICON_SIZE}
+    resized = {ICON_SIZE: img}
+    prev = img
+    for size in sorted(unique_sizes, reverse=True):
+        if size in resized:
+            continue
+        source = prev if prev.width == size * 2 else img
+        resized[size] = source.resize((size, size), Image.LANCZOS)
+        prev = resized[size]
+
+    outputs = []
     for size in icon_sizes:
         # Regular image
-        resized_img = img.resize((size, size), Image.LANCZOS)
-        resized_img.save(iconset_path / f"icon_{size}x{size}.png")
-        
+        outputs.append((iconset_path / f"icon_{size}x{size}.png", resized[size]))
+
         # High-resolution (2x) image
         if size * 2 <= ICON_SIZE:
-            double_size = size * 2
-            resized_img = img.resize((double_size, double_size), Image.LANCZOS)
-            resized_img.save(iconset_path / f"icon_{size}x{size}@2x.png")
+            outputs.append((iconset_path / f"icon_{size}x{size}@2x.png", resized[size * 2]))
+
+    # PNG encoding releases the GIL in zlib, so the independent saves run in parallel.
+    # A low compression level is plenty for icons this small.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(lambda item: item[1].save(item[0], compress_level=1), outputs))
     
     return iconset_path
 
+def write_icns(iconset_path, output_path):
+    """Pack the iconset PNGs into an ICNS file.
+
+    An ICNS file is the 'icns' magic plus total length, followed by one
+    (type, length, PNG data) element per image, so no iconutil is needed.
+    """
+    elements = []
+    for name, ostype in ICNS_TYPES.items():
+        png_path = iconset_path / name
+        if png_path.exists():
+            data = png_path.read_bytes()
+            elements.append(ostype + struct.pack('>I', 8 + len(data)) + data)
+    
+    body = b"".join(elements)
+    with open(output_path, 'wb') as f:
+        f.write(b"icns" + struct.pack('>I', 8 + len(body)) + body)
+
 def create_icns_file():
     """Create an ICNS file from the iconset."""
     print("Creating macOS app icon (AppIcon.icns)...")
@@ -84,29 +179,20 @@ def create_icns_file():
     # Create the iconset
     iconset_path = create_temp_iconset()
     
-    # Use iconutil (macOS only) to convert to icns
-    output_path = Path("AppIcon.icns")
-    if output_path.exists():
-        output_path.unlink()
-    
-    cmd = ["iconutil", "-c", "icns", str(iconset_path)]
-    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    
-    # Move the output file to the current directory
     output_icns = Path("AppIcon.icns")
-    if output_icns.exists():
-        print(f"Icon created successfully: {output_icns}")
-        return True
-    else:
-        print(f"Failed to create icon: {process.stderr}")
+    try:
+        write_icns(iconset_path, output_icns)
+    except OSError as e:
+        print(f"Failed to create icon: {e}")
         return False
+    finally:
+        shutil.rmtree(iconset_path.parent, ignore_errors=True)
+    
+    print(f"Icon created successfully: {output_icns}")
+    return True
 
 def main():
     """Main function."""
-    if sys.platform != "darwin":
-        print("This script is designed to run on macOS.")
-        return False
-    
     return create_icns_file()
 
 if __name__ == "__main__":
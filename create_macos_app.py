@@ -16,6 +16,16 @@ BUNDLE_ID = "com.clipmodego.scrambleclip2"
 VERSION = "1.0"
 ICON_NAME = "AppIcon.icns"  # Note: Icon file should be created separately
 
+def clone_tree(src, dst):
+    """Copy a directory tree, using APFS clonefile (cp -c) when possible."""
+    if not dst.exists():
+        # cp -c clones the whole tree copy-on-write instead of copying every byte
+        result = subprocess.run(["cp", "-cR", str(src), str(dst)],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            return
+    shutil.copytree(src, dst, dirs_exist_ok=True)
+
 def create_app_bundle():
     """Create a macOS .app bundle for Scramble Clip 2."""
     # Get the script directory
@@ -89,7 +99,7 @@ exit $?
     for item in script_dir.iterdir():
         if item.name != f"{APP_NAME}.app" and item.name != f"create_macos_app.py":
             if item.is_dir():
-                shutil.copytree(item, app_resources_dir / item.name, dirs_exist_ok=True)
+                clone_tree(item, app_resources_dir / item.name)
             else:
                 shutil.copy2(item, app_resources_dir / item.name)
     
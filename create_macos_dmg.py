@@ -10,6 +10,9 @@ import shutil
 import subprocess
 from pathlib import Path
 
+import create_macos_app
+from create_macos_app import clone_tree
+
 # Configuration
 APP_NAME = "Scramble Clip 2"
 VERSION = "1.0"
@@ -28,16 +31,14 @@ def run_command(cmd):
 def create_app_bundle():
     """Create a macOS .app bundle for Scramble Clip 2."""
     print("Creating macOS App bundle...")
-    # Check if create_macos_app.py exists and run it
-    if os.path.exists("create_macos_app.py"):
-        result = run_command([sys.executable, "create_macos_app.py"])
-        if not result:
-            print("Failed to create app bundle. Aborting.")
-            return False
-        return True
-    else:
-        print("Error: create_macos_app.py not found.")
+    # Build it in this interpreter rather than starting another Python for create_macos_app.py
+    try:
+        create_macos_app.create_app_bundle()
+    except Exception as e:
+        print(f"Error: {e}")
+        print("Failed to create app bundle. Aborting.")
         return False
+    return True
 
 def create_dmg():
     """Create a DMG file for distribution."""
@@ -55,8 +56,8 @@ def create_dmg():
         shutil.rmtree(temp_dir)
     temp_dir.mkdir()
     
-    # Copy the .app bundle to the temp directory
-    shutil.copytree(app_bundle, temp_dir / app_bundle.name)
+    # Copy the .app bundle to the temp directory (an APFS clone when possible)
+    clone_tree(app_bundle, temp_dir / app_bundle.name)
     
     # Create a symlink to /Applications for easy drag-and-drop installation
     os.symlink("/Applications", temp_dir / "Applications")
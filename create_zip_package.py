@@ -5,6 +5,7 @@ This script creates a ZIP file for distribution of Scramble Clip 2
 """
 
 import os
+import re
 import sys
 import shutil
 import zipfile
@@ -19,6 +20,7 @@ ZIP_NAME = f"{APP_NAME.replace(' ', '-')}-{VERSION}.zip"
 # Files and directories to exclude from the ZIP
 EXCLUDE = [
     "__pycache__",
+    ".cache",
     ".git",
     ".gitignore",
     ".DS_Store",
@@ -35,18 +37,46 @@ EXCLUDE = [
     "outputs/*.mov",
 ]
 
+# DEFLATE level for source/text members: level 1 is several times faster than
+# zlib's default 6 for only a few percent larger output
+COMPRESS_LEVEL = 1
+
+# Already-compressed formats gain nothing from DEFLATE, so they are stored as-is
+# (package_for_distribution.py keeps a copy of this set)
+STORED_EXTENSIONS = {".mp3", ".mp4", ".mov", ".png", ".jpg", ".jpeg", ".zip", ".gz", ".dmg", ".icns"}
+
+def _compile_exclude(patterns):
+    """Compile EXCLUDE into one regex: "*.ext" matches a suffix, anything else a substring."""
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith("*."):
+            parts.append(re.escape(pattern[1:]) + "$")
+        else:
+            parts.append(re.escape(pattern))
+    return re.compile("|".join(parts))
+
+EXCLUDE_RE = _compile_exclude(EXCLUDE)
+
 def should_exclude(path):
     """Check if a path should be excluded from the ZIP."""
-    path_str = str(path)
-    for pattern in EXCLUDE:
-        if pattern.startswith("*."):
-            # Handle file extension patterns
-            ext = pattern[1:]
-            if path_str.endswith(ext):
-                return True
-        elif pattern in path_str:
-            return True
-    return False
+    return EXCLUDE_RE.search(str(path)) is not None
+
+def collect_files(root_dir):
+    """Return the paths (as strings) of all files under root_dir that are not excluded."""
+    # Iterative scandir walk: DirEntry caches the file type, so there is no
+    # extra stat per entry, and paths stay plain strings instead of Path objects
+    file_paths = []
+    stack = [root_dir]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if should_exclude(entry.path):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    file_paths.append(entry.path)
+    return file_paths
 
 def create_zip_package():
     """Create a ZIP file containing the application."""
@@ -59,22 +89,29 @@ def create_zip_package():
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     zip_path = root_dir / f"{APP_NAME.replace(' ', '-')}-{VERSION}_{timestamp}.zip"
     
+    file_paths = collect_files(str(root_dir))
+    
+    stored = [p for p in file_paths if os.path.splitext(p)[1].lower() in STORED_EXTENSIONS]
+    deflated = [p for p in file_paths if os.path.splitext(p)[1].lower() not in STORED_EXTENSIONS]
+    
+    # Names are collected and printed in one write at the end rather than
+    # flushing stdout once per file
+    added = []
+    
     # Create a ZIP file
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(root_dir):
-            # Convert to Path objects for easier handling
-            root_path = Path(root)
-            
-            # Filter out directories to exclude
-            dirs[:] = [d for d in dirs if not should_exclude(root_path / d)]
-            
-            # Add files to the ZIP
-            for file in files:
-                file_path = root_path / file
-                if not should_exclude(file_path):
-                    arcname = file_path.relative_to(root_dir)
-                    print(f"Adding: {arcname}")
-                    zipf.write(file_path, arcname)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zipf:
+        for file_path in deflated:
+            arcname = os.path.relpath(file_path, root_dir)
+            added.append(f"Adding: {arcname}")
+            zipf.write(file_path, arcname)
+        
+        for file_path in stored:
+            arcname = os.path.relpath(file_path, root_dir)
+            added.append(f"Adding: {arcname}")
+            zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+    
+    if added:
+        sys.stdout.write("\n".join(added) + "\n")
     
     print(f"\nSuccess! ZIP package created: {zip_path}")
     print(f"File location: {os.path.abspath(zip_path)}")
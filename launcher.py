@@ -4,22 +4,23 @@ Cross-platform launcher for Scramble Clip 2
 This script checks for required dependencies and launches the application
 """
 
-import os
 import sys
 import subprocess
-import platform
+import importlib.util
+
+# Top-level modules the application needs at runtime
+REQUIRED_MODULES = ["moviepy", "numpy", "cv2", "PIL"]
 
 def check_dependencies():
     """Check if required dependencies are installed"""
-    try:
-        import moviepy
-        import numpy
-        import cv2
-        from PIL import Image
+    # find_spec only consults the import system; nothing is actually imported,
+    # so heavy packages like moviepy and cv2 are not initialised here
+    missing = [name for name in REQUIRED_MODULES if importlib.util.find_spec(name) is None]
+    if not missing:
         print("All dependencies are installed.")
         return True
-    except ImportError as e:
-        print(f"Missing dependency: {e}")
+    else:
+        print(f"Missing dependency: {', '.join(missing)}")
         
         # Ask user if they want to install dependencies
         response = input("Would you like to install missing dependencies? (y/n): ")
@@ -43,12 +44,9 @@ def launch_app():
     print("Launching Scramble Clip 2...")
     
     try:
-        # Use the appropriate command based on platform
-        if platform.system() == "Windows":
-            os.system("python main.py")
-        else:
-            os.system("python3 main.py")
-            
+        # Start the GUI in this process instead of spawning a second interpreter
+        from src._bootstrap import main
+        main()
         return True
     except Exception as e:
         print(f"Error launching application: {e}")
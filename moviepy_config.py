@@ -1,25 +1,56 @@
 import os
+import json
+from pathlib import Path
 from moviepy.config import change_settings
 
+# Remembers the last ImageMagick binary found ({"path": ..., "mtime": ...}) so
+# later launches only stat one file
+CACHE_FILE = Path.home() / ".cache" / "scrambleclip" / "imagemagick.json"
+
+def _read_cached_path():
+    """Return the cached ImageMagick path if it still points to the same binary."""
+    try:
+        cached = json.loads(CACHE_FILE.read_text())
+        path = cached["path"]
+        if os.stat(path).st_mtime == cached["mtime"]:
+            return path
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def _write_cached_path(path):
+    """Store the discovered ImageMagick path; failures just mean no cache."""
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CACHE_FILE.write_text(json.dumps({"path": path, "mtime": os.stat(path).st_mtime}))
+    except OSError:
+        pass
+
 def configure_moviepy():
     """Configure MoviePy to use the correct ImageMagick binary path."""
-    
+
+    cached = _read_cached_path()
+    if cached:
+        change_settings({"IMAGEMAGICK_BINARY": cached})
+        return True
+
     # List of possible ImageMagick binary paths
     possible_paths = [
         "/opt/homebrew/bin/convert",  # M1/M2 Mac typical path
         "/usr/local/bin/convert",     # Intel Mac typical path
         "/usr/bin/convert"            # Linux typical path
     ]
-    
+
     # Find the first path that exists
     for path in possible_paths:
         if os.path.exists(path):
             print(f"Found ImageMagick at: {path}")
             change_settings({"IMAGEMAGICK_BINARY": path})
+            _write_cached_path(path)
             return True
-    
+
     print("Warning: ImageMagick not found in standard locations")
     return False
 
 # Auto-configure when imported
-configure_moviepy() 
\ No newline at end of file
+configure_moviepy()
@@ -4,7 +4,8 @@ Package Scramble Clip 2 for distribution
 
 This script creates:
 1. A ZIP file with all necessary files for all platforms
-2. A DMG file for macOS users
+2. The same files as a .tar.zst (when zstandard is installed)
+3. A DMG file for macOS users
 """
 
 import os
@@ -13,10 +14,54 @@ import platform
 import shutil
 import subprocess
 import time
-from zipfile import ZipFile, ZIP_DEFLATED
+import tarfile
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
 
-def create_zip_package():
-    """Create a ZIP package with all necessary files"""
+# Copy in 1 MiB chunks instead of shutil's 64 KiB default when staging files
+shutil.COPY_BUFSIZE = 1024 * 1024
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Already-compressed formats; deflating them costs CPU for almost no size gain.
+# Kept in sync with create_zip_package.py by hand: that script leaves itself out
+# of the zip it builds, so the packaged copy of this file can't import it.
+STORED_EXTENSIONS = {'.mp3', '.mp4', '.mov', '.png', '.jpg', '.jpeg', '.zip', '.gz', '.dmg', '.icns'}
+
+def iter_package_files():
+    """Yield every file that goes into the distribution package, in one pass"""
+    # Main Python files and launch scripts
+    for file in os.listdir("."):
+        if file.endswith(".py") or file.endswith(".sh") or file.endswith(".bat"):
+            yield file
+    
+    # src and assets directories
+    for top in ("src", "assets"):
+        for root, _, files in os.walk(top):
+            for file in files:
+                yield os.path.join(root, file)
+    
+    # requirements.txt and README
+    for file in ("requirements.txt", "README.md"):
+        if os.path.exists(file):
+            yield file
+
+def clone_or_copy(src, dst_dir):
+    """Copy src into dst_dir, as an APFS copy-on-write clone (cp -c) when possible.
+    
+    Unlike a hard link, a clone shares no inode with src, so edits or
+    codesign/xattr passes on the bundle never reach the working tree.
+    """
+    dst = os.path.join(dst_dir, os.path.basename(src))
+    result = subprocess.run(["cp", "-c", src, dst],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if result.returncode != 0:
+        shutil.copy(src, dst)
+
+def create_zip_package(files=None):
+    """Create a ZIP package with all necessary files (default: iter_package_files())"""
     print("Creating ZIP package...")
     
     # Ensure dist directory exists
@@ -26,38 +71,48 @@ def create_zip_package():
     # Define the zip filename
     zip_filename = "dist/ScrambleClip2.zip"
     
-    # Create a new zip file
-    with ZipFile(zip_filename, 'w', ZIP_DEFLATED) as zipf:
-        # Add main Python files
-        for file in os.listdir("."):
-            if file.endswith(".py") or file.endswith(".sh") or file.endswith(".bat"):
-                zipf.write(file)
-        
-        # Add src directory
-        for root, _, files in os.walk("src"):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path)
-        
-        # Add assets directory
-        for root, _, files in os.walk("assets"):
-            for file in files:
-                file_path = os.path.join(root, file)
-                zipf.write(file_path)
-        
-        # Add requirements.txt
-        if os.path.exists("requirements.txt"):
-            zipf.write("requirements.txt")
+    file_paths = list(files) if files is not None else list(iter_package_files())
+    stored = [p for p in file_paths if os.path.splitext(p)[1].lower() in STORED_EXTENSIONS]
+    deflated = [p for p in file_paths if os.path.splitext(p)[1].lower() not in STORED_EXTENSIONS]
+    
+    # Create a new zip file; level 6 is zlib's usual speed/ratio balance
+    with ZipFile(zip_filename, 'w', ZIP_DEFLATED, compresslevel=6) as zipf:
+        for file_path in deflated:
+            zipf.write(file_path)
         
-        # Add README
-        if os.path.exists("README.md"):
-            zipf.write("README.md")
+        for file_path in stored:
+            zipf.write(file_path, compress_type=ZIP_STORED)
     
     print(f"ZIP package created at {os.path.abspath(zip_filename)}")
     return os.path.abspath(zip_filename)
 
-def create_macos_dmg():
-    """Create a DMG file for macOS users"""
+def create_zstd_package(files=None):
+    """Create a .tar.zst package with all necessary files (needs zstandard)"""
+    if zstandard is None:
+        print("zstandard is not installed; skipping .tar.zst package.")
+        return None
+    
+    print("Creating Zstandard tarball...")
+    
+    # Ensure dist directory exists
+    if not os.path.exists("dist"):
+        os.makedirs("dist")
+    
+    tar_filename = "dist/ScrambleClip2.tar.zst"
+    
+    # Level 15 roughly matches DEFLATE-9's ratio while compressing several
+    # times faster; threads=-1 uses one compression thread per core
+    cctx = zstandard.ZstdCompressor(level=15, threads=-1)
+    with open(tar_filename, "wb") as raw, cctx.stream_writer(raw) as compressed, \
+            tarfile.open(fileobj=compressed, mode="w|") as tar:
+        for file_path in (files if files is not None else iter_package_files()):
+            tar.add(file_path)
+    
+    print(f"Zstandard package created at {os.path.abspath(tar_filename)}")
+    return os.path.abspath(tar_filename)
+
+def create_macos_dmg(files=None):
+    """Create a DMG file for macOS users (default files: iter_package_files())"""
     if platform.system() != "Darwin":
         print("DMG creation is only supported on macOS.")
         return None
@@ -126,24 +181,15 @@ python3 main.py
     # Make it executable
     os.chmod(os.path.join(macos_dir, "ScrambleClip2"), 0o755)
     
-    # Copy Python files to Resources
-    for file in os.listdir("."):
-        if file.endswith(".py"):
-            shutil.copy(file, resources_dir)
-    
-    # Copy src directory
-    shutil.copytree("src", os.path.join(resources_dir, "src"))
-    
-    # Copy assets directory
-    shutil.copytree("assets", os.path.join(resources_dir, "assets"))
+    # Clone the shipped files into Resources (dist/ is on the same filesystem)
+    for file_path in (files if files is not None else iter_package_files()):
+        dst_dir = os.path.join(resources_dir, os.path.dirname(file_path))
+        os.makedirs(dst_dir, exist_ok=True)
+        clone_or_copy(file_path, dst_dir)
     
     # Create outputs directory
     os.makedirs(os.path.join(resources_dir, "outputs"), exist_ok=True)
     
-    # Copy requirements.txt
-    if os.path.exists("requirements.txt"):
-        shutil.copy("requirements.txt", resources_dir)
-    
     # Create icon if available, otherwise use a placeholder
     icon_path = os.path.join("assets", "icon.png")
     if os.path.exists(icon_path):
@@ -172,18 +218,32 @@ python3 main.py
         if os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
 
+def package(make_zip=True, make_zstd=True, make_dmg=None):
+    """
+    Build the distribution packages from one shared file list.
+    
+    The ZIP is always the main artifact; a .tar.zst of the same files is
+    added alongside it when zstandard is installed. make_dmg defaults to
+    True on macOS only. Returns (zip_path, zstd_path, dmg_path), with None
+    for anything not built.
+    """
+    if make_dmg is None:
+        make_dmg = platform.system() == "Darwin"
+    
+    # Walk the tree once for the archives and the DMG staging
+    files = list(iter_package_files())
+    
+    zip_path = create_zip_package(files) if make_zip else None
+    zstd_path = create_zstd_package(files) if make_zstd else None
+    dmg_path = create_macos_dmg(files) if make_dmg else None
+    return zip_path, zstd_path, dmg_path
+
 def main():
     """Main packaging function"""
     print("Packaging Scramble Clip 2 for distribution...")
     start_time = time.time()
     
-    # Create ZIP package
-    zip_path = create_zip_package()
-    
-    # Create DMG package on macOS
-    dmg_path = None
-    if platform.system() == "Darwin":
-        dmg_path = create_macos_dmg()
+    zip_path, zstd_path, dmg_path = package()
     
     # Print summary
     elapsed_time = time.time() - start_time
@@ -194,6 +254,10 @@ def main():
         size_mb = os.path.getsize(zip_path) / (1024 * 1024)
         print(f"- ZIP: {zip_path} ({size_mb:.2f} MB)")
     
+    if zstd_path:
+        size_mb = os.path.getsize(zstd_path) / (1024 * 1024)
+        print(f"- TAR.ZST: {zstd_path} ({size_mb:.2f} MB)")
+    
     if dmg_path:
         size_mb = os.path.getsize(dmg_path) / (1024 * 1024)
         print(f"- DMG: {dmg_path} ({size_mb:.2f} MB)")
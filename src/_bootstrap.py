@@ -0,0 +1,36 @@
+"""
+Shared startup sequence for Scramble Clip 2.
+Both main.py and launcher.py call main() from here so the GUI is started
+the same way, in the same process.
+"""
+
+import os
+import sys
+import traceback
+
+# Put the project root first on the Python path so project imports resolve
+# without probing every stdlib/site-packages entry first
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+def main():
+    """Apply runtime patches, configure MoviePy and run the PyQt GUI."""
+    try:
+        # Apply Pillow compatibility patch
+        print("Applying Pillow compatibility patch...")
+        import src.pil_patch
+
+        # Configure MoviePy to use the correct ImageMagick binary
+        print("Configuring MoviePy with ImageMagick...")
+        import moviepy_config
+
+        print("Importing PyQt GUI application...")
+        # Import GUI application
+        from src.pyqt_gui import main as gui_main
+
+        print("Starting PyQt application...")
+        gui_main()
+    except Exception as e:
+        print(f"Error: {e}")
+        print(traceback.format_exc())
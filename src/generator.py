@@ -1,35 +1,68 @@
-import os, random
+import os
 import warnings
 import hashlib
+import itertools
 import numpy as np
 from collections import defaultdict
-from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_videoclips, CompositeVideoClip, TextClip, ColorClip
-# Import specific effects for transitions only
-from moviepy.video.fx.loop import loop
-from moviepy.video.fx.fadein import fadein
-from moviepy.video.fx.fadeout import fadeout
-from moviepy.video.fx.crop import crop
-from moviepy.video.fx.colorx import colorx  # used for preview fades
-from moviepy.video.fx.speedx import speedx
 import subprocess, tempfile, os, shutil
+import json
+import time
+from functools import lru_cache
+import multiprocessing
+import platform
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
 
-from src.utils import get_video_files, get_random_clip, pad_clip_to_ratio, prepare_clip_for_concat
-from src.video_analysis import VideoContentAnalyzer
-
-# Suppress MoviePy warnings that might confuse users
-warnings.filterwarnings("ignore", category=UserWarning)
+# MoviePy (and the numpy/imageio/PIL stack behind it) is imported inside the
+# functions that use it, so importing this module stays cheap until a batch
+# is actually generated.
 
 # Default paths (can be overridden when called from GUI)
 INPUT_VIDEO_PATH = "../assets/input_videos"
 INPUT_AUDIO_PATH = "../assets/input_audio/audio.mp3"
 OUTPUT_PATH = "../outputs"
 
-# Initialize video analyzer
-video_analyzer = VideoContentAnalyzer()
+# Sources are normalized to this size once and cached here between batches
+NORMALIZED_WIDTH = 1080
+NORMALIZED_HEIGHT = 1920
+NORMALIZED_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scrambleclip", "normalized")
+# Plain renders stream-copy normalized video, so encode it a notch above the default quality
+NORMALIZED_CRF = 20
+# The least recently used normalized copies are deleted once the cache grows past this
+NORMALIZED_CACHE_MAX_BYTES = 10 * 1024 ** 3
+
+# Extra x264 options for normalized video, which every render decodes again:
+# a keyframe each second keeps stream-copy cuts close to the requested points,
+# fastdecode makes the repeated decodes cheaper and sync-lookahead=0 drops a
+# lookahead thread that is idle in these short encodes
+NORMALIZED_X264 = ["-g", "30", "-tune", "fastdecode", "-x264-params", "sync-lookahead=0"]
+
+# Visual signatures of source files, see create_video_signatures
+SIGNATURE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scrambleclip", "signatures")
+
+# Captions rasterized for the ffmpeg render path, see _caption_png
+CAPTION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "scrambleclip", "captions")
+
+# Parallel renders when encoding on a GPU/media engine, to stay within the
+# concurrent session limit of consumer hardware
+MAX_HW_ENCODES = 2
+
+# Buffer (bytes) for raw frames piped into ffmpeg; a 1080x1920 RGB frame is ~6 MB
+PIPE_SIZE = 1 << 20
 
 # Time-margin (sec) we leave between chosen sub-clip end and source video end to avoid ffprobe rounding
 SAFE_MARGIN = 0.25  # seconds
 
+# Overlap (sec) between consecutive clips when effects add transitions
+TRANSITION_OVERLAP = 0.3
+
+# Rows of clips compared at once by similarity_matrix, bounding its working
+# memory to about SIMILARITY_BLOCK_ROWS * clips * samples * 16 bytes
+SIMILARITY_BLOCK_ROWS = 256
+
+# Set bits in each byte value, for counting differing signature bits
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
 def generate_batch(input_videos, audio_files=None, num_videos=5, min_clips=10, max_clips=30, 
                    min_clip_duration=1.5, max_clip_duration=3.5, output_dir="outputs", base_name="output",
                    use_effects=False, use_text=False, custom_text=None,
@@ -69,6 +102,9 @@ def generate_batch(input_videos, audio_files=None, num_videos=5, min_clips=10, m
     Returns:
         list: Paths to the generated video files
     """
+    # Suppress MoviePy warnings that might confuse users
+    warnings.filterwarnings("ignore", category=UserWarning)
+    
     # Target duration for output videos (in seconds)
     TARGET_DURATION = target_duration
     
@@ -80,26 +116,45 @@ def generate_batch(input_videos, audio_files=None, num_videos=5, min_clips=10, m
     else:
         print(f"Loading {len(input_videos)} videos...")
     
-    # Load all input videos as MoviePy clips
-    try:
-        input_clips = [VideoFileClip(video_path) for video_path in input_videos]
-    except Exception as e:
-        # If we fail to load some videos, try to load them one by one to identify which ones work
-        input_clips = []
-        for video_path in input_videos:
-            try:
-                clip = VideoFileClip(video_path)
-                input_clips.append(clip)
-                if progress_callback:
-                    progress_callback(5, f"Successfully loaded {os.path.basename(video_path)}")
-                else:
-                    print(f"Successfully loaded {video_path}")
-            except Exception as e:
-                if progress_callback:
-                    progress_callback(5, f"Failed to load {os.path.basename(video_path)}: {e}")
-                else:
-                    print(f"Failed to load {video_path}: {e}")
+    # Probe every source once up front (in parallel) and drop the ones ffprobe
+    # can't read, so a bad file is reported once instead of failing later
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        durations = list(executor.map(_probe_duration, input_videos))
+    valid_videos = []
+    for video_path, duration in zip(input_videos, durations):
+        if duration:
+            valid_videos.append(video_path)
+        elif progress_callback:
+            progress_callback(0, f"Skipping unreadable video {os.path.basename(video_path)}")
+        else:
+            print(f"Skipping unreadable video {video_path}")
+    if not valid_videos:
+        raise ValueError("No valid input videos could be loaded")
+    input_videos = valid_videos
     
+    # Scale/pad every source to 1080x1920 once (cached on disk) so clips need
+    # no per-frame resizing during rendering. Each encode is an ffmpeg
+    # process, so several run at once with the cores split between them.
+    if progress_callback:
+        progress_callback(0, f"Normalizing {len(input_videos)} videos...")
+    parallel = min(len(input_videos), os.cpu_count() or 1, 4)
+    threads = max(1, (os.cpu_count() or 1) // parallel)
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        input_videos = list(executor.map(lambda path: _prenormalize(path, threads), input_videos))
+    _evict_normalized_cache(keep=input_videos)
+    
+    # Describe the sources from ffprobe; MoviePy clips are only opened for
+    # renders that fall back to MoviePy
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sources = list(executor.map(_open_source, input_videos))
+    input_clips = []
+    for video_path, source in zip(input_videos, sources):
+        if source:
+            input_clips.append(source)
+        elif progress_callback:
+            progress_callback(5, f"Skipping unreadable video {os.path.basename(video_path)}")
+        else:
+            print(f"Skipping unreadable video {video_path}")
     if not input_clips:
         raise ValueError("No valid input videos could be loaded")
     
@@ -114,10 +169,6 @@ def generate_batch(input_videos, audio_files=None, num_videos=5, min_clips=10, m
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # Create a global history of used clip segments across all videos in batch
-    # This tracks which parts of which clips have been used to avoid reuse across the batch
-    clip_history = {}  # Maps clip_index to a list of (start_time, end_time) tuples
-    
     # Track visual similarity of clips to avoid similar looking clips
     # Create a visual fingerprint for each video to compare similarity
     if len(input_clips) > 1:  # Only calculate if we have multiple clips
@@ -129,677 +180,1561 @@ def generate_batch(input_videos, audio_files=None, num_videos=5, min_clips=10, m
         
     output_paths = []
     
-    # Set consistent dimensions for output videos
-    TARGET_WIDTH = 1080
-    TARGET_HEIGHT = 1920
-    
     # Normalize intensity between 0 and 1 for internal use
     intensity_norm = max(0, min(effects_intensity, 100)) / 100.0
     
-    for i in range(num_videos):
-        # Calculate overall progress: each video is worth (90/num_videos)% of progress
-        base_progress = 10 + (i * (80 / num_videos))
-        
+    # Encode each soundtrack to AAC once for the whole batch; outputs then mux
+    # it in with a stream copy instead of re-encoding the same audio per video.
+    # One spare second covers outputs that run slightly over the target.
+    # Files ffmpeg can't decode are dropped, so videos render without them.
+    audio_dir = tempfile.mkdtemp(prefix="scrambleclip_audio_")
+    audio_tracks = {}
+    for n, audio_path in enumerate(sorted(set(audio_files or []))):
+        track = _encode_audio_track(audio_path, TARGET_DURATION + 1, os.path.join(audio_dir, f"{n}.m4a"))
+        if track:
+            audio_tracks[audio_path] = track
+        elif progress_callback:
+            progress_callback(5, f"Error adding audio: could not decode {os.path.basename(audio_path)}")
+        else:
+            print(f"Error adding audio from {audio_path}: ffmpeg could not decode it")
+    audio_files = [path for path in (audio_files or []) if path in audio_tracks]
+    
+    render_options = dict(
+        target_duration=TARGET_DURATION, intensity_norm=intensity_norm,
+        audio_tracks=audio_tracks,
+        use_effects=use_effects, use_text=use_text, custom_text=custom_text,
+        font_name=font_name, bold=bold, italic=italic, underline=underline,
+        text_position=text_position, speed_factor=speed_factor,
+        effects_style=effects_style, overlay_video_path=overlay_video_path,
+        # Scored once here so renders only index into it
+        similarity=similarity_matrix(visual_signatures) if visual_signatures else None,
+    )
+    
+    # Every output video is an independent encode, so render them in
+    # separate processes (not threads) to use all cores.
+    workers = min(num_videos, os.cpu_count() or 1)
+    if _pick_codec()[0] != "libx264":
+        # Consumer GPUs only allow a few concurrent hardware encode sessions
+        workers = min(workers, MAX_HW_ENCODES)
+    if workers > 1:
         if progress_callback:
-            progress_callback(int(base_progress), f"Building video {i+1}/{num_videos}...")
+            progress_callback(10, f"Rendering {num_videos} videos in {workers} processes...")
         else:
-            print(f"Building {output_dir}/{base_name}_{i+1:02d}.mp4 using MoviePy...")
-        
-        output_path = os.path.join(output_dir, f"{base_name}_{i+1:02d}.mp4")
+            print(f"Rendering {num_videos} videos in {workers} processes...")
         
-        # Calculate clip parameters based on target duration
-        # For 16 second videos, aim for 8-12 clips with 1.5-2.5 seconds each
-        min_clip_count = 8
-        max_clip_count = 12
-        num_clips = random.randint(min_clip_count, max_clip_count)
+        # Split the cores between the workers' encoders instead of letting
+        # every x264 instance start one thread per core
+        render_options["threads"] = max(1, (os.cpu_count() or 1) // workers)
         
-        # Calculate average clip duration to fit target duration
-        avg_clip_duration = TARGET_DURATION / num_clips
-        # Add some variation around the average
-        min_clip_dur = max(1.5, avg_clip_duration * 0.8)  # Min 1.5 seconds
-        max_clip_dur = min(3.0, avg_clip_duration * 1.2)  # Max 3.0 seconds
+        # spawn rather than fork: the GUI process has Qt and ffmpeg reader threads running
+        ctx = multiprocessing.get_context("spawn")
         
-        # Randomly select clips and durations
-        selected_clips = []
-        total_duration = 0
+        # Workers send (video index, progress, message) here; it is drained on
+        # this thread, which owns progress_callback
+        progress_queue = ctx.Queue() if progress_callback else None
+        fractions = dict.fromkeys(range(num_videos), 0.0)
         
-        # Track the already used clips for this video to avoid repetition
-        used_clips_memory = []
-        memory_size = min(5, len(input_clips) // 2)  # Remember last 5 clips or half of available clips
+        def drain_progress():
+            while True:
+                try:
+                    i, pct, message = progress_queue.get_nowait()
+                except Empty:
+                    return
+                # Map the worker's per-video progress onto the whole batch
+                video_fraction = (pct - 10 - i * (80 / num_videos)) * num_videos / 80
+                fractions[i] = min(1.0, max(fractions[i], video_fraction))
+                progress_callback(int(10 + 80 * sum(fractions.values()) / num_videos), message)
         
-        # Initialize local clip history for this video
-        local_clip_history = defaultdict(list)
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=ctx,
+                                 initializer=_init_render_worker,
+                                 initargs=(input_clips, progress_queue)) as executor:
+            futures = {
+                executor.submit(_render_job, i, num_videos, output_dir, base_name,
+                                visual_signatures, audio_files, render_options): i
+                for i in range(num_videos)
+            }
+            pending = set(futures)
+            done = 0
+            while pending:
+                finished, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                if progress_queue is not None:
+                    drain_progress()
+                for future in finished:
+                    i = futures[future]
+                    done += 1
+                    fractions[i] = 1.0
+                    overall = int(10 + 80 * sum(fractions.values()) / num_videos)
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        results[i] = None
+                        if progress_callback:
+                            progress_callback(overall, f"Error rendering video {i+1}/{num_videos}: {e}")
+                        else:
+                            print(f"Error rendering video {i+1}/{num_videos}: {e}")
+                        continue
+                    if progress_callback:
+                        progress_callback(overall, f"Video {i+1}/{num_videos} complete! ({done}/{num_videos} done)")
         
-        for j in range(num_clips):
-            # Progress update for clip selection
-            clip_progress = base_progress + ((j / num_clips) * (20 / num_videos))
+        output_paths = [results[i] for i in sorted(results) if results[i]]
+    else:
+        # Encode each video on a writer thread while the next one is assembled;
+        # ffmpeg does the encoding outside the GIL. At most one write is in flight.
+        # A video that fails to build or write is reported and skipped, like
+        # in the worker processes above.
+        def report_failure(i, e):
             if progress_callback:
-                progress_callback(int(clip_progress), f"Selecting clip {j+1}/{num_clips} for video {i+1}/{num_videos}")
-            
-            # Get available clip indices, avoiding recently used clips
-            available_clip_indices = list(range(len(input_clips)))
-            
-            # Remove recently used clips from consideration
-            for used_idx in used_clips_memory:
-                if used_idx in available_clip_indices and len(available_clip_indices) > 1:
-                    available_clip_indices.remove(used_idx)
-            
-            # If we have visual signatures, try to select dissimilar clips
-            if visual_signatures and len(available_clip_indices) > 1:
-                # If we have at least one selected clip already, try to find a dissimilar one
-                if selected_clips:
-                    clip_index = select_dissimilar_clip(
-                        available_clip_indices, 
-                        used_clips_memory, 
-                        visual_signatures
-                    )
-                else:
-                    # For the first clip, just choose randomly
-                    clip_index = random.choice(available_clip_indices)
+                progress_callback(int(10 + 80 * (i + 1) / num_videos), f"Error rendering video {i+1}/{num_videos}: {e}")
             else:
-                # If no visual signatures or only one clip available, choose randomly
-                clip_index = random.choice(available_clip_indices)
-                
-            input_clip = input_clips[clip_index]
-            
-            # Add to used clips memory
-            used_clips_memory.append(clip_index)
-            if len(used_clips_memory) > memory_size:
-                used_clips_memory.pop(0)  # Remove oldest
-            
-            # Avoid selecting the same clip consecutively
-            if selected_clips:
-                last_clip_index = used_clips_memory[-1]  # Use the last used clip index
-                if clip_index == last_clip_index:
-                    available_clip_indices.remove(clip_index)
-                    if available_clip_indices:
-                        clip_index = random.choice(available_clip_indices)
-                        input_clip = input_clips[clip_index]
-
-            # Calculate remaining duration needed to hit the target
-            remaining_clips = num_clips - j
-            remaining_duration = max(0, TARGET_DURATION - total_duration)
-            
-            # Adjust duration for this clip
-            if remaining_clips > 1:
-                # Leave some duration for remaining clips
-                max_this_clip = min(max_clip_dur, remaining_duration / remaining_clips * 1.5)
-                clip_duration = random.uniform(min_clip_dur, max_this_clip)
-            else:
-                # Last clip - use remaining duration
-                clip_duration = min(max_clip_dur, remaining_duration)
-                clip_duration = max(min_clip_dur, clip_duration)  # Ensure minimum duration
-            
-            # Attempt to find an available segment with a limited retry loop
-            attempts = 0
-            max_attempts = 20
-            available_segments = []
-            while attempts < max_attempts and not available_segments:
-                available_segments = find_available_segments(
-                    clip_index, clip_duration, input_clip.duration,
-                    global_history=None,
-                    local_history=local_clip_history.get(clip_index, [])
+                print(f"Error rendering video {i+1}/{num_videos}: {e}")
+
+        def collect(i, future):
+            try:
+                path = future.result()
+            except Exception as e:
+                report_failure(i, e)
+                return
+            if path:
+                output_paths.append(path)
+
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            pending = None
+            for i in range(num_videos):
+                try:
+                    write = _render_one(input_clips, i, num_videos, output_dir, base_name,
+                                        visual_signatures, audio_files, progress_callback,
+                                        defer_write=True, **render_options)
+                except Exception as e:
+                    report_failure(i, e)
+                    continue
+                if pending is not None:
+                    collect(*pending)
+                pending = (i, writer.submit(write))
+            if pending is not None:
+                collect(*pending)
+    
+    # Clean up
+    _close_clips()
+    shutil.rmtree(audio_dir, ignore_errors=True)
+    
+    # Final progress update
+    if progress_callback:
+        progress_callback(100, f"All {len(output_paths)} videos complete!")
+    
+    return output_paths
+
+# Source videos of the batch in a render worker process (see _init_render_worker)
+_worker_clips = []
+
+# Clips opened by _open_clip and _open_audio, keyed by (path, has_mask or "audio")
+_clip_cache = {}
+
+def _open_clip(path, has_mask=False):
+    """
+    Return a VideoFileClip for path, opening it at most once per process.
+    
+    Opening a clip probes the container with ffmpeg, so sources and the
+    overlay are shared by every video of a batch instead of reopened.
+    """
+    key = (path, has_mask)
+    if key not in _clip_cache:
+        from moviepy.editor import VideoFileClip
+        _clip_cache[key] = VideoFileClip(path, has_mask=has_mask)
+    return _clip_cache[key]
+
+def _open_audio(path):
+    """Return an AudioFileClip for path, opened at most once per process like _open_clip."""
+    key = (path, "audio")
+    if key not in _clip_cache:
+        from moviepy.editor import AudioFileClip
+        _clip_cache[key] = AudioFileClip(path)
+    return _clip_cache[key]
+
+def _close_clips():
+    """Close and forget every clip opened by _open_clip and _open_audio."""
+    for clip in _clip_cache.values():
+        clip.close()
+    _clip_cache.clear()
+
+class SourceVideo:
+    """
+    A source video's filename, duration and (display) size, read with ffprobe.
+    
+    That is all the ffmpeg render paths need, so the MoviePy clip (and its
+    ffmpeg reader process) is only opened through _open_clip once something
+    asks for frames. Any other attribute is looked up on that clip.
+    """
+    def __init__(self, filename, duration, size):
+        self.filename = filename
+        self.duration = duration
+        self.size = size
+    
+    @property
+    def w(self):
+        return self.size[0]
+    
+    @property
+    def h(self):
+        return self.size[1]
+    
+    @property
+    def clip(self):
+        """The VideoFileClip behind this source, opened on first use."""
+        return _open_clip(self.filename)
+    
+    def __getattr__(self, name):
+        # Only reached for attributes not set above; dunders must fail here
+        # so pickling (to render workers) never opens the clip
+        if name.startswith("__") or name == "filename":
+            raise AttributeError(name)
+        return getattr(self.clip, name)
+
+def _open_source(path, duration=None):
+    """Return a SourceVideo for path, or None if ffprobe finds no video stream in it."""
+    stream = _probe(path)
+    duration = duration or _probe_duration(path)
+    if not stream or not duration or "width" not in stream:
+        return None
+    width, height = stream["width"], stream["height"]
+    # Rotated phone footage is shown (and decoded by MoviePy) turned upright
+    if _rotation(stream) % 180 == 90:
+        width, height = height, width
+    return SourceVideo(path, duration, (width, height))
+
+def _rotation(stream):
+    """Return the rotation in degrees (0 if none) of an ffprobe video stream."""
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    try:
+        return int(float(rotation or 0))
+    except ValueError:
+        return 0
+
+# Progress queue back to generate_batch, set per worker by _init_render_worker
+_progress_queue = None
+
+# Per-process generator for every random choice _render_one makes; each
+# worker seeds its own from OS entropy so videos never share a random stream
+_rng = np.random.default_rng()
+
+def _build_segment(input_clip, start_time, clip_duration, resize, effect):
+    """
+    Cut clip_duration seconds from input_clip at start_time, fit the cut to
+    1080x1920 if resize, and apply effect (a _pick_smart_effect choice or None).
+    
+    Returns:
+        The processed clip, or None if the result is empty
+    """
+    subclip = input_clip.subclip(start_time, start_time + clip_duration)
+    if subclip.duration <= 0:
+        return None
+    
+    # Ensure consistent dimensions and padding for all clips
+    processed_clip = ensure_consistent_dimensions(subclip) if resize else subclip
+    
+    if effect is not None:
+        try:
+            processed_clip = _apply_smart_effect(processed_clip, effect)
+        except Exception as e:
+            print(f"Error applying effects to clip: {e}")
+    
+    if processed_clip is None or processed_clip.duration <= 0:
+        return None
+    return processed_clip
+
+def _pick(items, draw):
+    """Pick one of items, like random.choice, using a pre-drawn uniform [0, 1) value."""
+    items = tuple(items)
+    return items[int(draw * len(items))]
+
+def _init_render_worker(sources, progress_queue=None):
+    """
+    Process pool initializer: take the batch's SourceVideos (already probed
+    by generate_batch). Their MoviePy clips are opened only if a render in
+    this worker falls back to MoviePy.
+    """
+    # Suppress MoviePy warnings that might confuse users
+    warnings.filterwarnings("ignore", category=UserWarning)
+    
+    global _worker_clips, _rng, _progress_queue
+    _worker_clips = sources
+    _rng = np.random.default_rng()
+    _progress_queue = progress_queue
+
+def _render_job(i, num_videos, output_dir, base_name, visual_signatures, audio_files, render_options):
+    """Process pool entry point: render video i from this worker's source videos."""
+    def send_progress(pct, message):
+        _progress_queue.put((i, pct, message))
+    
+    return _render_one(_worker_clips, i, num_videos, output_dir, base_name, visual_signatures,
+                       audio_files, send_progress if _progress_queue is not None else None,
+                       **render_options)
+
+def _render_one(input_clips, i, num_videos, output_dir, base_name, visual_signatures, audio_files,
+                progress_callback=None, *, target_duration, intensity_norm,
+                use_effects, use_text, custom_text, font_name, bold, italic, underline,
+                text_position, speed_factor, effects_style, overlay_video_path, audio_tracks=None,
+                similarity=None, threads=None, defer_write=False):
+    """
+    Build and render output video number i (0-based) of a batch.
+    
+    Parameters are those of generate_batch; input_clips are the batch's
+    SourceVideos, intensity_norm is effects_intensity scaled to 0-1 and audio_tracks
+    maps audio file paths to their pre-encoded AAC tracks. similarity is
+    similarity_matrix(visual_signatures), computed here if not given. threads
+    caps the encoder threads (default: one per core).
+    
+    With defer_write the clip is only built, and a zero-argument function that
+    encodes it (and returns what this function otherwise would) is returned
+    instead, so the caller can run the encode on another thread.
+    
+    Returns:
+        str: Path to the rendered video, or None if rendering failed
+    """
+    from moviepy.editor import concatenate_videoclips, CompositeVideoClip
+    # Import specific effects for transitions only
+    from moviepy.video.fx.loop import loop
+    from moviepy.video.fx.fadein import fadein
+    from moviepy.video.fx.fadeout import fadeout
+    from moviepy.video.fx.colorx import colorx  # used for preview fades
+    from moviepy.video.fx.speedx import speedx
+    
+    TARGET_DURATION = target_duration
+    
+    # Set consistent dimensions for output videos
+    TARGET_WIDTH = 1080
+    TARGET_HEIGHT = 1920
+    
+    # Segments of each clip used by this video: clip_index -> [(start_time, end_time)]
+    clip_history = {}
+    
+    # Calculate overall progress: each video is worth (90/num_videos)% of progress
+    base_progress = 10 + (i * (80 / num_videos))
+    
+    if progress_callback:
+        progress_callback(int(base_progress), f"Building video {i+1}/{num_videos}...")
+    else:
+        print(f"Building {output_dir}/{base_name}_{i+1:02d}.mp4 using MoviePy...")
+    
+    output_path = os.path.join(output_dir, f"{base_name}_{i+1:02d}.mp4")
+    
+    # Calculate clip parameters based on target duration
+    # For 16 second videos, aim for 8-12 clips with 1.5-2.5 seconds each
+    min_clip_count = 8
+    max_clip_count = 12
+    num_clips = int(_rng.integers(min_clip_count, max_clip_count + 1))
+    
+    # Calculate average clip duration to fit target duration
+    avg_clip_duration = TARGET_DURATION / num_clips
+    # Add some variation around the average
+    min_clip_dur = max(1.5, avg_clip_duration * 0.8)  # Min 1.5 seconds
+    max_clip_dur = min(3.0, avg_clip_duration * 1.2)  # Max 3.0 seconds
+    
+    # Randomly select clips and durations
+    total_duration = 0
+    
+    # Cuts chosen for this video as (clip_index, start_time, duration, effect),
+    # effect being a _pick_smart_effect choice or None. They only become
+    # MoviePy clips if ffmpeg can't render them directly (see build_clips).
+    cuts = []
+    
+    # Track the already used clips for this video to avoid repetition
+    used_clips_memory = []
+    if similarity is None and visual_signatures:
+        similarity = similarity_matrix(visual_signatures)
+    memory_size = min(5, len(input_clips) // 2)  # Remember last 5 clips or half of available clips
+    
+    # Initialize local clip history for this video
+    local_clip_history = defaultdict(list)
+    
+    # Source durations, read once instead of through each clip on every pick
+    durations = np.fromiter((c.duration for c in input_clips), dtype=np.float64, count=len(input_clips))
+    
+    all_clip_indices = set(range(len(input_clips)))
+    
+    # Pre-normalized sources (and so all their subclips) are already 1080x1920
+    needs_resize = [c.size != (TARGET_WIDTH, TARGET_HEIGHT) for c in input_clips]
+    
+    # Draw every per-clip random value of the selection loop in one call
+    pick_draws, segment_draws, duration_draws, start_draws, effect_draws = _rng.random((5, num_clips))
+    
+    for j in range(num_clips):
+        # Progress update for clip selection
+        clip_progress = base_progress + ((j / num_clips) * (20 / num_videos))
+        if progress_callback:
+            progress_callback(int(clip_progress), f"Selecting clip {j+1}/{num_clips} for video {i+1}/{num_videos}")
+        
+        # Get available clip indices, avoiding recently used clips
+        # (but keeping the latest one if every clip was used recently)
+        available_clip_indices = all_clip_indices - set(used_clips_memory)
+        if not available_clip_indices:
+            available_clip_indices = {used_clips_memory[-1]}
+        
+        # If we have visual signatures, try to select dissimilar clips
+        if visual_signatures and len(available_clip_indices) > 1:
+            # If we have at least one selected clip already, try to find a dissimilar one
+            if cuts:
+                clip_index = select_dissimilar_clip(
+                    list(available_clip_indices), 
+                    used_clips_memory, 
+                    visual_signatures,
+                    similarity=similarity
                 )
-                if available_segments:
-                    break
-                # Pick another clip index and retry
-                if len(available_clip_indices) > 1:
-                    available_clip_indices.remove(clip_index)  # Remove the failed clip index
-                    clip_index = random.choice(available_clip_indices)
-                    input_clip = input_clips[clip_index]
-                else:
-                    # If we only have one clip left, try to use it anyway
-                    break
-                attempts += 1
+            else:
+                # For the first clip, just choose randomly
+                clip_index = _pick(available_clip_indices, pick_draws[j])
+        else:
+            # If no visual signatures or only one clip available, choose randomly
+            clip_index = _pick(available_clip_indices, pick_draws[j])
             
-            if not available_segments:
-                # If we couldn't find a free segment, try to use any part of the clip
-                if input_clip.duration >= clip_duration:
-                    start_time = random.uniform(0, input_clip.duration - clip_duration)
-                    available_segments = [(start_time, input_clip.duration)]
-                else:
-                    # If the clip is too short, skip it
-                    if progress_callback:
-                        progress_callback(int(clip_progress), f"Skipping clip {j+1}/{num_clips} - too short")
-                    continue
+        # Add to used clips memory
+        used_clips_memory.append(clip_index)
+        if len(used_clips_memory) > memory_size:
+            used_clips_memory.pop(0)  # Remove oldest
+        
+        # Avoid selecting the same clip consecutively
+        if cuts:
+            last_clip_index = used_clips_memory[-1]  # Use the last used clip index
+            if clip_index == last_clip_index:
+                available_clip_indices.discard(clip_index)
+                if available_clip_indices:
+                    clip_index = _pick(available_clip_indices, _rng.random())
+
+        # Calculate remaining duration needed to hit the target
+        remaining_clips = num_clips - j
+        remaining_duration = max(0, TARGET_DURATION - total_duration)
+        
+        # Adjust duration for this clip
+        if remaining_clips > 1:
+            # Leave some duration for remaining clips
+            max_this_clip = min(max_clip_dur, remaining_duration / remaining_clips * 1.5)
+            clip_duration = min_clip_dur + (max_this_clip - min_clip_dur) * duration_draws[j]
+        else:
+            # Last clip - use remaining duration
+            clip_duration = min(max_clip_dur, remaining_duration)
+            clip_duration = max(min_clip_dur, clip_duration)  # Ensure minimum duration
+        
+        # Attempt to find an available segment with a limited retry loop
+        attempts = 0
+        max_attempts = 20
+        available_segments = []
+        while attempts < max_attempts and not available_segments:
+            available_segments = find_available_segments(
+                clip_index, clip_duration, durations[clip_index],
+                global_history=None,
+                local_history=local_clip_history.get(clip_index, [])
+            )
+            if available_segments:
+                break
+            # Pick another clip index and retry
+            if len(available_clip_indices) > 1:
+                available_clip_indices.discard(clip_index)  # Remove the failed clip index
+                clip_index = _pick(available_clip_indices, _rng.random())
+            else:
+                # If we only have one clip left, try to use it anyway
+                break
+            attempts += 1
+        
+        if not available_segments:
+            # If we couldn't find a free segment, try to use any part of the clip
+            if durations[clip_index] >= clip_duration:
+                start_time = _rng.uniform(0, durations[clip_index] - clip_duration)
+                available_segments = [(start_time, durations[clip_index])]
+            else:
+                # If the clip is too short, skip it
+                if progress_callback:
+                    progress_callback(int(clip_progress), f"Skipping clip {j+1}/{num_clips} - too short")
+                continue
+        
+        # Choose a random segment from available ones with a safety margin so we don't hit EOF
+        segment_start, segment_end = _pick(available_segments, segment_draws[j])
+        max_start = max(segment_start, segment_end - clip_duration - SAFE_MARGIN)
+        if max_start < segment_start:
+            max_start = segment_start  # fallback
+        start_time = segment_start + (max_start - segment_start) * start_draws[j]
+        # Sources shorter than the cut only give what they have
+        clip_duration = min(clip_duration, durations[clip_index] - start_time)
+        
+        # Record this usage in both global and local history
+        used_segment = (start_time, start_time + clip_duration)
+        if clip_index not in clip_history:
+            clip_history[clip_index] = []
+        clip_history[clip_index].append(used_segment)
+        
+        if clip_index not in local_clip_history:
+            local_clip_history[clip_index] = []
+        local_clip_history[clip_index].append(used_segment)
+        
+        # Apply AI-powered effects if enabled (but with reduced probability)
+        effect = None
+        if use_effects and intensity_norm > 0 and effect_draws[j] < (0.3 + 0.4*intensity_norm):
+            effect = _pick_smart_effect(intensity_norm)
+        
+        cuts.append((clip_index, start_time, clip_duration, effect))
+        total_duration += clip_duration
+        
+        # If we've reached the target duration, stop adding clips
+        if total_duration >= TARGET_DURATION:
+            break
+    
+    # If we don't have enough duration, add more clips
+    while total_duration < TARGET_DURATION and len(cuts) < max_clip_count * 2:
+        # Try to add more clips to reach target duration
+        try:
+            # Calculate remaining duration needed
+            remaining_duration = TARGET_DURATION - total_duration
+            clip_duration = min(max_clip_dur, remaining_duration)
+            clip_duration = max(min_clip_dur, clip_duration)
             
-            # Choose a random segment from available ones with a safety margin so we don't hit EOF
-            segment_start, segment_end = random.choice(available_segments)
-            max_start = max(segment_start, segment_end - clip_duration - SAFE_MARGIN)
-            if max_start < segment_start:
-                max_start = segment_start  # fallback
-            start_time = random.uniform(segment_start, max_start)
+            # Select a new clip, preferring ones long enough for the segment
+            eligible = np.flatnonzero(durations >= clip_duration + SAFE_MARGIN)
+            clip_index = int(_rng.choice(eligible)) if len(eligible) else int(_rng.integers(len(input_clips)))
             
-            # Record this usage in both global and local history
-            used_segment = (start_time, start_time + clip_duration)
-            if clip_index not in clip_history:
-                clip_history[clip_index] = []
-            clip_history[clip_index].append(used_segment)
+            # Find available segment
+            available_segments = find_available_segments(
+                clip_index, clip_duration, durations[clip_index],
+                global_history=None,
+                local_history=local_clip_history.get(clip_index, [])
+            )
             
-            if clip_index not in local_clip_history:
-                local_clip_history[clip_index] = []
-            local_clip_history[clip_index].append(used_segment)
+            # If no available segments, break to avoid infinite loop
+            if not available_segments:
+                if progress_callback:
+                    progress_callback(int(base_progress), "No more available segments, stopping additional clip addition")
+                break
             
-            # Extract the subclip
-            try:
-                # Robust extraction – retry a few times if we get a zero-length clip (metadata edge-cases)
-                retry = 0
-                subclip = None
-                while retry < 5:
-                    sc = input_clip.subclip(start_time, start_time + clip_duration)
-                    if sc.duration >= clip_duration - 0.05:  # accept small drift
-                        subclip = sc
-                        break
-                    # Otherwise pick a new start inside the same segment
-                    start_time = random.uniform(segment_start, max_start)
-                    retry += 1
-                if subclip is None:
-                    raise ValueError("Could not create valid subclip after retries")
+            if available_segments:
+                segment_start, segment_end = _pick(available_segments, _rng.random())
+                max_start = max(segment_start, segment_end - clip_duration - SAFE_MARGIN)
+                if max_start < segment_start:
+                    max_start = segment_start  # fallback
+                start_time = _rng.uniform(segment_start, max_start)
+                clip_duration = min(clip_duration, durations[clip_index] - start_time)
                 
-                # Ensure consistent dimensions and padding for all clips
-                processed_clip = ensure_consistent_dimensions(subclip)
+                effect = None
+                if use_effects and intensity_norm > 0 and _rng.random() < (0.3 + 0.4*intensity_norm):
+                    effect = _pick_smart_effect(intensity_norm)
                 
-                # Apply AI-powered effects if enabled (but with reduced probability)
-                if use_effects and intensity_norm > 0 and random.random() < (0.3 + 0.4*intensity_norm):
-                    try:
-                        processed_clip = apply_smart_effects(processed_clip, intensity=intensity_norm)
-                    except Exception as e:
-                        print(f"Error applying effects to clip: {e}")
+                cuts.append((clip_index, start_time, clip_duration, effect))
+                total_duration += clip_duration
                 
-                # Verify the clip is valid before adding it
-                if processed_clip is not None and processed_clip.duration > 0:
-                    selected_clips.append(processed_clip)
-                    total_duration += clip_duration
-                else:
-                    print(f"Warning: Invalid processed clip, skipping")
-                    continue
+                # Record usage
+                used_segment = (start_time, start_time + clip_duration)
+                if clip_index not in clip_history:
+                    clip_history[clip_index] = []
+                clip_history[clip_index].append(used_segment)
                 
-            except Exception as e:
-                print(f"Error processing clip: {e}")
-                continue
-            
-            # If we've reached the target duration, stop adding clips
-            if total_duration >= TARGET_DURATION:
-                break
+        except Exception as e:
+            print(f"Error adding additional clip: {e}")
+            break
+    
+    # If still short after attempts, try to grab ultra-short slices (<=1s) from random clips
+    ultra_attempts = 0
+    while total_duration < TARGET_DURATION - 0.05 and ultra_attempts < 10:
+        clip_idx = int(_rng.integers(len(input_clips)))
+        seg_len = min(1.0, TARGET_DURATION - total_duration, durations[clip_idx])
+        if seg_len < 0.05:
+            ultra_attempts += 1
+            continue
+        if durations[clip_idx] <= seg_len + 0.1:
+            seg_start = 0
+        else:
+            seg_start = _rng.uniform(0, durations[clip_idx] - seg_len)
+        cuts.append((clip_idx, seg_start, seg_len, None))
+        total_duration += seg_len
+
+    # Only build_clips can pad a video that is still short (by looping its
+    # last clip), so such videos skip the ffmpeg render paths
+    needs_padding = total_duration < TARGET_DURATION - 0.05
+
+    def build_clips():
+        """
+        Turn cuts into MoviePy clips, opening the sources they come from.
         
-        # If we don't have enough duration, add more clips
-        while total_duration < TARGET_DURATION and len(selected_clips) < max_clip_count * 2:
-            # Try to add more clips to reach target duration
+        Only the MoviePy render needs this; cuts that fail to build are
+        skipped and a short result is padded by looping its last clip.
+        """
+        clips = []
+        for clip_index, start_time, clip_duration, effect in cuts:
             try:
-                # Select a new clip
-                available_clip_indices = list(range(len(input_clips)))
-                clip_index = random.choice(available_clip_indices)
-                input_clip = input_clips[clip_index]
-                
-                # Calculate remaining duration needed
-                remaining_duration = TARGET_DURATION - total_duration
-                clip_duration = min(max_clip_dur, remaining_duration)
-                clip_duration = max(min_clip_dur, clip_duration)
-                
-                # Find available segment
-                available_segments = find_available_segments(
-                    clip_index, clip_duration, input_clip.duration,
-                    global_history=None,
-                    local_history=local_clip_history.get(clip_index, [])
-                )
-                
-                # If no available segments, break to avoid infinite loop
-                if not available_segments:
-                    if progress_callback:
-                        progress_callback(int(base_progress), "No more available segments, stopping additional clip addition")
-                    break
-                
-                if available_segments:
-                    segment_start, segment_end = random.choice(available_segments)
-                    max_start = max(segment_start, segment_end - clip_duration - SAFE_MARGIN)
-                    if max_start < segment_start:
-                        max_start = segment_start  # fallback
-                    start_time = random.uniform(segment_start, max_start)
-                    
-                    # Extract and process the subclip
-                    subclip = input_clip.subclip(start_time, start_time + clip_duration)
-                    processed_clip = ensure_consistent_dimensions(subclip)
-                    
-                    if use_effects and intensity_norm > 0 and random.random() < (0.3 + 0.4*intensity_norm):
-                        try:
-                            processed_clip = apply_smart_effects(processed_clip, intensity=intensity_norm)
-                        except Exception as e:
-                            print(f"Error applying effects to clip: {e}")
-                    
-                    # Verify the clip is valid before adding it
-                    if processed_clip is not None and processed_clip.duration > 0:
-                        selected_clips.append(processed_clip)
-                        total_duration += clip_duration
-                        
-                        # Record usage
-                        used_segment = (start_time, start_time + clip_duration)
-                        if clip_index not in clip_history:
-                            clip_history[clip_index] = []
-                        clip_history[clip_index].append(used_segment)
-                    else:
-                        print(f"Warning: Invalid processed clip, skipping")
-                        continue
-                    
+                clip = _build_segment(input_clips[clip_index].clip, start_time, clip_duration,
+                                      needs_resize[clip_index], effect)
             except Exception as e:
-                print(f"Error adding additional clip: {e}")
-                break
-        
-        # If still short after attempts, try to grab an ultra-short slice (<=1s) from random clips
-        ultra_attempts = 0
-        while total_duration < TARGET_DURATION - 0.05 and ultra_attempts < 10:
-            clip_idx = random.randrange(len(input_clips))
-            base_clip = input_clips[clip_idx]
-            seg_len = min(1.0, TARGET_DURATION - total_duration)
-            if base_clip.duration <= seg_len + 0.1:
-                seg_start = 0
-            else:
-                seg_start = random.uniform(0, base_clip.duration - seg_len)
-            seg_end = seg_start + seg_len
-            seg = base_clip.subclip(seg_start, seg_end)
-            seg = ensure_consistent_dimensions(seg)
-            if seg.duration > 0:
-                selected_clips.append(seg)
-                total_duration += seg.duration
-            else:
-                ultra_attempts += 1
+                print(f"Error processing clip: {e}")
                 continue
-
-        # Final safety: if still short, loop last clip
-        if total_duration < TARGET_DURATION - 0.05:
-            last_clip = selected_clips[-1]
-            pad_needed = TARGET_DURATION - total_duration
-            padded = loop(last_clip, duration=last_clip.duration + pad_needed)
-            if padded is not None and padded.duration > 0:
-                selected_clips[-1] = padded
-                total_duration = TARGET_DURATION
+            if clip is not None:
+                clips.append(clip)
         
-        # Ensure we have at least one valid clip
-        if not selected_clips or len(selected_clips) == 0:
-            # Warn and fallback to using the first input video clip
+        if not clips:
+            # Warn and fall back to the first input video, looped to the target duration
             if progress_callback:
                 progress_callback(int(base_progress), f"No valid clips for video {i+1}, using fallback clip.")
             else:
                 print(f"No valid clips for {output_path}, using fallback clip.")
-            # Fallback: take the first clip and loop/subclip to match target duration
-            base_clip = input_clips[0]
-            # Determine subclip duration
-            sub_dur = min(TARGET_DURATION, base_clip.duration)
-            fallback_clip = base_clip.subclip(0, sub_dur)
-            fallback_clip = ensure_consistent_dimensions(fallback_clip)
-            if sub_dur < TARGET_DURATION:
-                fallback_clip = loop(fallback_clip, duration=TARGET_DURATION)
-            selected_clips = [fallback_clip]
-            total_duration = TARGET_DURATION
+            fallback_clip = input_clips[0].clip.subclip(0, min(TARGET_DURATION, durations[0]))
+            if needs_resize[0]:
+                fallback_clip = ensure_consistent_dimensions(fallback_clip)
+            clips = [fallback_clip]
         
-        final_clip = None
-
-        try:
-            # Progress update for effect stage
-            effect_progress = base_progress + (60 / num_videos)
+        # Final safety: if still short, loop last clip
+        pad_needed = TARGET_DURATION - sum(clip.duration for clip in clips)
+        if pad_needed > 0.05:
+            padded = loop(clips[-1], duration=clips[-1].duration + pad_needed)
+            if padded is not None and padded.duration > 0:
+                clips[-1] = padded
+        return clips
+    
+    # (source path, start, end) and effect of each cut, for the ffmpeg render paths
+    segments = [(input_clips[k].filename, start, start + duration) for k, start, duration, _ in cuts]
+    segment_effects = [effect for _, _, _, effect in cuts]
+    
+    # Unless the caption needs ImageMagick, there is nothing MoviePy has to
+    # draw, so ffmpeg renders the video directly (the caption is a still PNG).
+    # Plain cuts of sources that are already 1080x1920 need no decoding at
+    # all: the concat demuxer stream-copies them and only the audio is
+    # encoded. Anything else - fitting, transitions, colour effects, speed
+    # changes and the overlay video - runs as a single ffmpeg filter graph,
+    # instead of MoviePy processing and compositing every frame in Python.
+    use_fx = use_effects and intensity_norm > 0
+    # Picked once, so the MoviePy fallback shows the same caption
+    caption_text = _pick_caption(custom_text, i) if use_text else None
+    caption = None
+    if use_text and segments:
+        caption = _caption_png(caption_text, (TARGET_WIDTH, TARGET_HEIGHT), text_position,
+                               font_name=font_name, bold=bold, italic=italic, underline=underline)
+    plain_render = not use_fx and abs(speed_factor - 1.0) <= 0.01 and not overlay_video_path and not caption
+    if (caption or not use_text) and segments and not needs_padding:
+        audio_path = _pick(audio_files, _rng.random()) if audio_files else None
+        audio_track = (audio_tracks or {}).get(audio_path)
+        size = (TARGET_WIDTH, TARGET_HEIGHT)
+        
+        def encode_progress(fraction):
             if progress_callback:
-                progress_callback(int(effect_progress), f"Applying effects and transitions for video {i+1}/{num_videos}")
-            
-            # Ensure we have valid clips before proceeding
-            if not selected_clips or len(selected_clips) == 0:
-                raise ValueError("No valid clips available for concatenation")
-            
-            # Verify all clips are valid before concatenation
-            valid_clips = []
-            for clip in selected_clips:
-                if clip is not None and clip.duration > 0:
-                    valid_clips.append(clip)
-                else:
-                    print(f"Warning: Invalid clip found, skipping")
-            
-            if not valid_clips:
-                raise ValueError("No valid clips available after validation")
-            
-            selected_clips = valid_clips  # Use only valid clips
-            
-            # If we're using effects, add simple transitions between clips
-            if use_effects and intensity_norm > 0:
-                # Choose effects pipeline based on style
-                if effects_style == "graincore":
-                    # Hardcore glitchy B&W aesthetic: strong contrast, noise, and frame blending
-                    filter_str = (
-                        "format=gray,"
-                        "eq=contrast=5:brightness=-0.2,"
-                        # heavy static noise
-                        "noise=alls=100:allf=u+random,"
-                        # blending adjacent frames for glitch flicker
-                        "tblend=all_mode=difference:opacity=0.8,"
-                        "format=yuv420p"
-                    )
-                else:
-                    pass  # Graincore effect now applied in FFmpeg stage
-
-                # Classic transitions (MoviePy fades only)
-                processed = []
-                for idx, clip in enumerate(selected_clips):
-                    c = clip
-                    if idx == 0:
-                        c = c.fx(fadein, 0.4)
-                    if idx == len(selected_clips) - 1:
-                        c = c.fx(fadeout, 0.4)
-                    # Subtle brightness boost for variety
-                    c = colorx(c, 1.03)
-                    processed.append(c)
-
-                # Concatenate with 0.3-second cross-fade between clips
-                final_clip = concatenate_videoclips(processed, method="compose", padding=-0.3)
+                progress = base_progress + (75 + 23 * fraction) / num_videos
+                progress_callback(int(progress), f"Rendering video {i+1}/{num_videos}... {int(fraction * 100)}%")
+        
+        if plain_render:
+            rendered = (_concat_copy(segments, audio_track or audio_path, output_path, size,
+                                     copy_audio=audio_track is not None)
+                        or (audio_path and _concat_filter(segments, audio_track or audio_path, output_path, size,
+                                                          copy_audio=audio_track is not None,
+                                                          on_progress=encode_progress, threads=threads)))
+        elif audio_path:
+            rendered = _concat_filter(audio_path=audio_track or audio_path, out_file=output_path, size=size,
+                                      copy_audio=audio_track is not None, on_progress=encode_progress,
+                                      overlay_path=overlay_video_path, caption=caption, threads=threads,
+                                      **_effects_graph(segments, segment_effects, use_fx, effects_style,
+                                                       intensity_norm, speed_factor, TARGET_DURATION))
+        else:
+            rendered = False
+        
+        if rendered:
+            if progress_callback:
+                progress_callback(int(base_progress + (98 / num_videos)), f"Video {i+1}/{num_videos} complete!")
+            return (lambda: output_path) if defer_write else output_path
+    
+    selected_clips = build_clips()
+    final_clip = None
+    writer = None
+
+    try:
+        # Progress update for effect stage
+        effect_progress = base_progress + (60 / num_videos)
+        if progress_callback:
+            progress_callback(int(effect_progress), f"Applying effects and transitions for video {i+1}/{num_videos}")
+        
+        # Ensure we have valid clips before proceeding
+        if not selected_clips or len(selected_clips) == 0:
+            raise ValueError("No valid clips available for concatenation")
+        
+        # Verify all clips are valid before concatenation
+        valid_clips = []
+        for clip in selected_clips:
+            if clip is not None and clip.duration > 0:
+                valid_clips.append(clip)
             else:
-                # Simple concatenation without transitions
-                final_clip = concatenate_videoclips(selected_clips)
-            
-            # Apply global speed factor if not 1.0
-            if abs(speed_factor - 1.0) > 0.01:
-                final_clip = final_clip.fx(speedx, speed_factor)
+                print(f"Warning: Invalid clip found, skipping")
+        
+        if not valid_clips:
+            raise ValueError("No valid clips available after validation")
+        
+        selected_clips = valid_clips  # Use only valid clips
+        
+        # If we're using effects, add simple transitions between clips
+        if use_effects and intensity_norm > 0:
+            # The style's color grade (graincore included) is applied by
+            # ffmpeg during the encode; see _effects_filter
 
-                # If speeding up shortened the clip, pad/loop to ensure 16-s output
-                if final_clip.duration < TARGET_DURATION - 0.05:
-                    try:
-                        pad_needed = TARGET_DURATION - final_clip.duration
-                        # Loop the clip end portion to pad
-                        final_clip = loop(final_clip, duration=final_clip.duration + pad_needed)
-                    except Exception as le:
-                        print(f"Warning: could not loop for padding: {le}")
-                elif final_clip.duration > TARGET_DURATION + 0.05:
-                    # Trim if overshoot
-                    final_clip = final_clip.subclip(0, TARGET_DURATION)
-
-            # Check final clip dimensions and ensure they're correct
-            final_clip = ensure_consistent_dimensions(final_clip)
-            
-            # Check if the final clip is too long and trim if necessary
-            if final_clip.duration > TARGET_DURATION + 1:  # Allow 1 second buffer
-                if progress_callback:
-                    progress_callback(int(effect_progress), f"Trimming video to target duration ({TARGET_DURATION}s)")
+            # Classic transitions (MoviePy fades only)
+            processed = []
+            for idx, clip in enumerate(selected_clips):
+                c = clip
+                if idx == 0:
+                    c = c.fx(fadein, 0.4)
+                if idx == len(selected_clips) - 1:
+                    c = c.fx(fadeout, 0.4)
+                # Subtle brightness boost for variety
+                c = colorx(c, 1.03)
+                processed.append(c)
+
+            # Concatenate with 0.3-second cross-fade between clips
+            final_clip = concatenate_videoclips(processed, method="compose", padding=-TRANSITION_OVERLAP)
+        else:
+            # Simple concatenation without transitions
+            final_clip = concatenate_videoclips(selected_clips)
+        
+        # Apply global speed factor if not 1.0
+        if abs(speed_factor - 1.0) > 0.01:
+            final_clip = final_clip.fx(speedx, speed_factor)
+
+            # If speeding up shortened the clip, pad/loop to ensure 16-s output
+            if final_clip.duration < TARGET_DURATION - 0.05:
+                try:
+                    pad_needed = TARGET_DURATION - final_clip.duration
+                    # Loop the clip end portion to pad
+                    final_clip = loop(final_clip, duration=final_clip.duration + pad_needed)
+                except Exception as le:
+                    print(f"Warning: could not loop for padding: {le}")
+            elif final_clip.duration > TARGET_DURATION + 0.05:
+                # Trim if overshoot
                 final_clip = final_clip.subclip(0, TARGET_DURATION)
+
+        # Check final clip dimensions and ensure they're correct; concatenating
+        # same-sized clips keeps their size, so this is usually a no-op
+        if final_clip.size != (TARGET_WIDTH, TARGET_HEIGHT):
+            final_clip = ensure_consistent_dimensions(final_clip)
+        
+        # Check if the final clip is too long and trim if necessary
+        if final_clip.duration > TARGET_DURATION + 1:  # Allow 1 second buffer
+            if progress_callback:
+                progress_callback(int(effect_progress), f"Trimming video to target duration ({TARGET_DURATION}s)")
+            final_clip = final_clip.subclip(0, TARGET_DURATION)
+        
+        # Add text overlay if enabled
+        if use_text:
+            text_progress = base_progress + (65 / num_videos)
+            if progress_callback:
+                progress_callback(int(text_progress), f"Adding text overlay to video {i+1}/{num_videos}")
             
-            # Add text overlay if enabled
-            if use_text:
-                text_progress = base_progress + (65 / num_videos)
-                if progress_callback:
-                    progress_callback(int(text_progress), f"Adding text overlay to video {i+1}/{num_videos}")
+            try:
+                caption = caption_text
                 
-                try:
-                    # Use custom text if provided, otherwise generate a random caption
-                    if custom_text:
-                        caption = custom_text
-                    else:
-                        # Generate a random caption
-                        captions = [
-                            "WATCH TILL THE END 😱",
-                            "POV: When the beat drops 🔥",
-                            "This is INSANE 🤯",
-                            "Wait for it... 👀",
-                            "Best moments 💯",
-                            "Try not to be amazed 😮",
-                            "Crazy skills 💪",
-                            "Ultimate compilation 🏆",
-                            "The perfect edit doesn't exi- 😲",
-                            "Caught in 4K 📸",
-                            "Vibe check ✅",
-                            f"Part {i+1} 🎬"
-                        ]
-                        caption = random.choice(captions)
+                # Create text overlay
+                txt_clip = create_text_overlay(
+                    caption,
+                    (final_clip.w, final_clip.h),
+                    position=text_position,
+                    font_name=font_name,
+                    bold=bold,
+                    italic=italic,
+                    underline=underline,
+                    fontsize=int(final_clip.w * 0.07),  # Scale font to video width
+                    color="white",
+                    bg_color=(0, 0, 0, 0.6),  # Semi-transparent black
+                    stroke_color="black",
+                    stroke_width=2
+                )
+                
+                # Add text to the video if creation was successful
+                if txt_clip is not None:
+                    # Ensure the text duration matches the video
+                    txt_clip = txt_clip.set_duration(final_clip.duration)
                     
-                    # Create text overlay
-                    txt_clip = create_text_overlay(
-                        caption,
-                        (final_clip.w, final_clip.h),
-                        position=text_position,
-                        font_name=font_name,
-                        bold=bold,
-                        italic=italic,
-                        underline=underline,
-                        fontsize=int(final_clip.w * 0.07),  # Scale font to video width
-                        color="white",
-                        bg_color=(0, 0, 0, 0.6),  # Semi-transparent black
-                        stroke_color="black",
-                        stroke_width=2
-                    )
+                    # Composite the text on top of the video
+                    final_clip = CompositeVideoClip([final_clip, txt_clip])
                     
-                    # Add text to the video if creation was successful
-                    if txt_clip is not None:
-                        # Ensure the text duration matches the video
-                        txt_clip = txt_clip.set_duration(final_clip.duration)
-                        
-                        # Composite the text on top of the video
-                        final_clip = CompositeVideoClip([final_clip, txt_clip])
-                        
-                        if progress_callback:
-                            progress_callback(int(text_progress), f"Added text overlay: '{caption}'")
-                    else:
-                        if progress_callback:
-                            progress_callback(int(text_progress), f"Warning: Text overlay creation failed")
-                except Exception as e:
                     if progress_callback:
-                        progress_callback(int(text_progress), f"Error adding text: {e}")
-                    else:
-                        print(f"Error adding text overlay: {e}")
-            
-            # -------------------------------------------------------------
-            # Transparent overlay video (e.g., animated lyrics)
-            # -------------------------------------------------------------
-            if overlay_video_path:
-                overlay_progress = base_progress + (68 / num_videos)
+                        progress_callback(int(text_progress), f"Added text overlay: '{caption}'")
+                else:
+                    if progress_callback:
+                        progress_callback(int(text_progress), f"Warning: Text overlay creation failed")
+            except Exception as e:
                 if progress_callback:
-                    progress_callback(int(overlay_progress), f"Adding overlay video to video {i+1}/{num_videos}")
+                    progress_callback(int(text_progress), f"Error adding text: {e}")
+                else:
+                    print(f"Error adding text overlay: {e}")
+        
+        # -------------------------------------------------------------
+        # Transparent overlay video (e.g., animated lyrics)
+        # -------------------------------------------------------------
+        # When the soundtrack is muxed in afterwards (always, given audio
+        # files) the encode is driven by ffmpeg directly (see
+        # _write_with_overlay), which composites the overlay itself instead
+        # of MoviePy blending every frame in Python
+        overlay_input = None
+        if overlay_video_path and audio_files:
+            overlay_input = overlay_video_path
+        elif overlay_video_path:
+            overlay_progress = base_progress + (68 / num_videos)
+            if progress_callback:
+                progress_callback(int(overlay_progress), f"Adding overlay video to video {i+1}/{num_videos}")
 
-                try:
-                    overlay_clip = VideoFileClip(overlay_video_path, has_mask=True)
+            try:
+                overlay_clip = _open_clip(overlay_video_path, has_mask=True)
 
-                    # Scale overlay to fit within the final clip while PRESERVING aspect ratio.
-                    # Never stretch – only scale up/down uniformly so that it fully fits inside.
-                    if overlay_clip.w != final_clip.w or overlay_clip.h != final_clip.h:
-                        scale_factor = min(final_clip.w / overlay_clip.w, final_clip.h / overlay_clip.h)
-                        # Only resize if scale factor meaningfully differs from 1.0 (avoid tiny math jitter)
-                        if abs(scale_factor - 1.0) > 0.01:
-                            overlay_clip = overlay_clip.resize(scale_factor)
+                # Scale overlay to fit within the final clip while PRESERVING aspect ratio.
+                # Never stretch – only scale up/down uniformly so that it fully fits inside.
+                if overlay_clip.w != final_clip.w or overlay_clip.h != final_clip.h:
+                    scale_factor = min(final_clip.w / overlay_clip.w, final_clip.h / overlay_clip.h)
+                    # Only resize if scale factor meaningfully differs from 1.0 (avoid tiny math jitter)
+                    if abs(scale_factor - 1.0) > 0.01:
+                        overlay_clip = overlay_clip.resize(scale_factor)
 
-                    # Center the overlay if it does not cover the entire canvas
-                    if overlay_clip.w < final_clip.w or overlay_clip.h < final_clip.h:
-                        overlay_clip = overlay_clip.set_position("center")
+                # Center the overlay if it does not cover the entire canvas
+                if overlay_clip.w < final_clip.w or overlay_clip.h < final_clip.h:
+                    overlay_clip = overlay_clip.set_position("center")
 
-                    # Match overlay duration to final clip
-                    if overlay_clip.duration < final_clip.duration - 0.05:
-                        overlay_clip = loop(overlay_clip, duration=final_clip.duration)
-                    elif overlay_clip.duration > final_clip.duration + 0.05:
-                        overlay_clip = overlay_clip.subclip(0, final_clip.duration)
+                # Match overlay duration to final clip
+                if overlay_clip.duration < final_clip.duration - 0.05:
+                    overlay_clip = loop(overlay_clip, duration=final_clip.duration)
+                elif overlay_clip.duration > final_clip.duration + 0.05:
+                    overlay_clip = overlay_clip.subclip(0, final_clip.duration)
 
-                    overlay_clip = overlay_clip.set_duration(final_clip.duration)
+                overlay_clip = overlay_clip.set_duration(final_clip.duration)
 
-                    # Composite overlay on top of final clip
-                    final_clip = CompositeVideoClip([final_clip, overlay_clip])
+                # Composite overlay on top of final clip
+                final_clip = CompositeVideoClip([final_clip, overlay_clip])
 
-                    if progress_callback:
-                        progress_callback(int(overlay_progress), f"Overlay added to video {i+1}/{num_videos}")
-                except Exception as e:
-                    # If anything fails, continue without overlay
-                    if progress_callback:
-                        progress_callback(int(overlay_progress), f"Warning: Failed to apply overlay: {e}")
-                    else:
-                        print(f"Warning: Failed to apply overlay video: {e}")
-            
-            # Progress update for audio stage
-            audio_progress = base_progress + (70 / num_videos)
-            if progress_callback:
-                progress_callback(int(audio_progress), f"Adding audio to video {i+1}/{num_videos}")
-                
-            # Select or generate audio
-            if audio_files and len(audio_files) > 0:
-                audio_path = random.choice(audio_files)
-                try:
-                    audio = AudioFileClip(audio_path)
-                    
-                    # Ensure audio is exactly as long as the video
-                    target_duration = final_clip.duration
-                    if audio.duration < target_duration:
-                        # Loop the audio to match video duration exactly
-                        audio = loop(audio, duration=target_duration)
-                    else:
-                        # Trim audio to match video duration exactly
-                        audio = audio.subclip(0, target_duration)
-                        
-                    final_clip = final_clip.set_audio(audio)
-                    if progress_callback:
-                        progress_callback(int(audio_progress), f"Added audio to video {i+1}/{num_videos}")
-                    else:
-                        print(f"Added audio from {audio_path}")
-                except Exception as e:
-                    if progress_callback:
-                        progress_callback(int(audio_progress), f"Error adding audio: {e}")
-                    else:
-                        print(f"Error adding audio from {audio_path}: {e}")
+                if progress_callback:
+                    progress_callback(int(overlay_progress), f"Overlay added to video {i+1}/{num_videos}")
+            except Exception as e:
+                # If anything fails, continue without overlay
+                if progress_callback:
+                    progress_callback(int(overlay_progress), f"Warning: Failed to apply overlay: {e}")
+                else:
+                    print(f"Warning: Failed to apply overlay video: {e}")
+        
+        # Progress update for audio stage
+        audio_progress = base_progress + (70 / num_videos)
+        if progress_callback:
+            progress_callback(int(audio_progress), f"Adding audio to video {i+1}/{num_videos}")
             
-            # Progress update for rendering stage
-            render_progress = base_progress + (75 / num_videos)
+        # Select or generate audio. It is muxed in after rendering (see
+        # _finish_output): a batch-wide AAC track is stream-copied, any other
+        # file is looped or trimmed and encoded by ffmpeg, rather than
+        # MoviePy looping it in Python
+        audio_track = None
+        mux_audio = None
+        if audio_files and len(audio_files) > 0:
+            audio_path = _pick(audio_files, _rng.random())
+            audio_track = (audio_tracks or {}).get(audio_path)
+            mux_audio = audio_track or audio_path
             if progress_callback:
-                progress_callback(int(render_progress), f"Rendering video {i+1}/{num_videos}...")
+                progress_callback(int(audio_progress), f"Added audio to video {i+1}/{num_videos}")
             else:
-                print(f"Writing audio for {output_path}...")
-            
-            # Ensure final clip has exact 9:16 dimensions before writing
-            if final_clip.w != TARGET_WIDTH or final_clip.h != TARGET_HEIGHT:
-                final_clip = final_clip.resize(width=TARGET_WIDTH, height=TARGET_HEIGHT)
-            
-            # Write the final video to temp file first (no heavy effects yet)
+                print(f"Added audio from {audio_path}")
+        
+        # Progress update for rendering stage
+        render_progress = base_progress + (75 / num_videos)
+        if progress_callback:
+            progress_callback(int(render_progress), f"Rendering video {i+1}/{num_videos}...")
+        else:
+            print(f"Writing audio for {output_path}...")
+        
+        # Ensure the output has exact 9:16 dimensions. Pre-normalized sources
+        # already do; anything else is fit by ffmpeg during the encode (as in
+        # the direct render path) rather than by MoviePy resizing every frame.
+        video_filters = []
+        if final_clip.w != TARGET_WIDTH or final_clip.h != TARGET_HEIGHT:
+            video_filters.append(_fit_filter(final_clip.w, final_clip.h, (TARGET_WIDTH, TARGET_HEIGHT)))
+        
+        # The effects grade runs in the same encode rather than a second pass
+        if use_effects and intensity_norm > 0:
+            grade = _effects_filter(effects_style, intensity_norm)
+            if grade:
+                video_filters.append(grade)
+        vf_params = ["-vf", ",".join(video_filters)] if video_filters else []
+        
+        def write_video():
+            """Encode final_clip to output_path; returns the path, or None on failure."""
+            # Write the final video, graded, in one encode; the soundtrack is
+            # muxed in afterwards
+            tmp_video = output_path
             try:
-                tmp_no_fx = tempfile.mktemp(suffix="_nofx.mp4")
+                if mux_audio:
+                    # Next to the output, so _finish_output's mux never crosses filesystems
+                    fd, tmp_video = tempfile.mkstemp(suffix=".part.mp4",
+                                                     dir=os.path.dirname(os.path.abspath(output_path)))
+                    os.close(fd)
+                codec, preset, codec_params = _pick_codec()
+                if overlay_input:
+                    _write_with_overlay(final_clip, overlay_input, tmp_video, codec, preset, codec_params,
+                                        ",".join(video_filters), threads)
+                    if mux_audio:
+                        _finish_output(tmp_video, output_path, mux_audio, copy_audio=audio_track is not None)
+                    if progress_callback:
+                        progress_callback(int(base_progress + (98 / num_videos)), f"Video {i+1}/{num_videos} complete!")
+                    return output_path
                 final_clip.write_videofile(
-                    tmp_no_fx,
-                    codec="libx264",
+                    tmp_video,
+                    codec=codec,
+                    audio=mux_audio is None,
                     audio_codec="aac",
-                    preset="fast",
-                    threads=4,
+                    preset=preset,
+                    ffmpeg_params=codec_params + vf_params + ["-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+                    threads=threads or os.cpu_count(),
                     logger=None
                 )
-
-                # Apply FFmpeg effects if requested
-                if use_effects and intensity_norm > 0:
-                    if progress_callback:
-                        progress_callback(int(base_progress + (92 / num_videos)), "Applying FFmpeg effects...")
-
-                    def build_filter(style, t):
-                        """Return FFmpeg filter string based on style and normalized intensity t (0-1)."""
-                        t = max(0.0, min(t, 1.0))
-                        if t < 0.05:  # practically no effect
-                            return None
-
-                        if style == "classic":
-                            brightness = round(0.0 + 0.10 * t, 3)  # up to +0.10
-                            saturation = round(1.0 + 1.5 * t, 2)   # up to 2.5x
-                            return f"eq=brightness={brightness}:saturation={saturation}"
-
-                        if style == "graincore":
-                            contrast = round(1.0 + 4.0 * t, 2)      # 1-5
-                            brightness = round(-0.2 * t, 2)         # 0 to -0.2
-                            noise = int(20 + 180 * t)               # 20-200
-                            opacity = round(0.1 + 0.8 * t, 2)       # 0.1-0.9
-                            return (
-                                f"format=gray,eq=contrast={contrast}:brightness={brightness},"
-                                f"noise=alls={noise}:allf=u+random,"  # static flicker
-                                f"tblend=all_mode=difference:opacity={opacity},format=yuv420p"
-                            )
-
-                        # Fallback minimal adjustment
-                        return "eq=brightness=0:saturation=1"
-
-                    filter_str = build_filter(effects_style, intensity_norm)
-
-                    if filter_str is None:
-                        # No effect needed, simply move original file
-                        shutil.move(tmp_no_fx, output_path)
-                        if progress_callback:
-                            progress_callback(int(base_progress + (98 / num_videos)), f"Video {i+1}/{num_videos} complete!")
-                        output_paths.append(output_path)
-                        continue
-
-                    tmp_with_fx = tempfile.mktemp(suffix="_fx.mp4")
-                    ffmpeg_cmd = [
-                        "ffmpeg",
-                        "-y",
-                        "-i", tmp_no_fx,
-                        "-vf", filter_str,
-                        "-c:v", "libx264",
-                        "-preset", "fast",
-                        "-crf", "18",
-                        "-c:a", "copy",
-                        tmp_with_fx
-                    ]
-                    subprocess.run(ffmpeg_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-                    shutil.move(tmp_with_fx, output_path)
-                    os.remove(tmp_no_fx)
-                else:
-                    shutil.move(tmp_no_fx, output_path)
+                if mux_audio:
+                    _finish_output(tmp_video, output_path, mux_audio, copy_audio=audio_track is not None)
 
                 if progress_callback:
                     progress_callback(int(base_progress + (98 / num_videos)), f"Video {i+1}/{num_videos} complete!")
-                output_paths.append(output_path)
+                return output_path
             except Exception as e:
+                if tmp_video != output_path and os.path.exists(tmp_video):
+                    os.remove(tmp_video)
+                # Re-encoding with MoviePy's defaults would only repeat the same
+                # work more slowly, so the video is reported as failed instead
                 if progress_callback:
-                    progress_callback(int(render_progress), f"Error writing video file: {e}. Trying simplifier method...")
+                    progress_callback(int(render_progress), f"Error writing video {i+1}/{num_videos}: {e}")
                 else:
                     print(f"Error writing video file {output_path}: {e}")
-                try:
-                    # Try a simpler approach if the first attempt fails
-                    if progress_callback:
-                        progress_callback(int(render_progress), f"Using simplified render settings...")
-                    else:
-                        print("Trying with simpler options...")
-                    final_clip.write_videofile(output_path)
-                    output_paths.append(output_path)
-                except Exception as e2:
-                    if progress_callback:
-                        progress_callback(int(render_progress), f"Failed again: {e2}")
-                    else:
-                        print(f"Failed again: {e2}")
-                    
-        except Exception as e:
-            if progress_callback:
-                progress_callback(int(base_progress), f"Error creating final clip: {e}")
-            else:
-                print(f"Error creating final clip: {e}")
-                import traceback
-                traceback.print_exc()
+                return None
+        writer = write_video
         
-        # Clean up memory
-        if final_clip:
-            final_clip.close()
+    except Exception as e:
+        if progress_callback:
+            progress_callback(int(base_progress), f"Error creating final clip: {e}")
+        else:
+            print(f"Error creating final clip: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    def finish():
+        """Write the video (if it was built) and release its clips."""
+        try:
+            return writer() if writer else None
+        finally:
+            # Clean up memory
+            if final_clip:
+                final_clip.close()
+
+            for clip in selected_clips:
+                clip.close()
+    
+    return finish if defer_write else finish()
+
+def _write_with_overlay(clip, overlay_path, out_file, codec, preset, codec_params, vf="", threads=None):
+    """
+    Encode a MoviePy clip with overlay_path composited on top by ffmpeg.
+    
+    The clip's frames are piped to ffmpeg as raw RGB; the overlay video is
+    scaled to fit (keeping its aspect ratio), centered and looped to the clip,
+    then vf is applied to the result. No audio is written.
+    
+    Raises:
+        RuntimeError: If ffmpeg failed
+    """
+    width, height = clip.size
+    fps = clip.fps or 30
+    graph = (f"[1:v]scale={width}:{height}:force_original_aspect_ratio=decrease[ovl];"
+             f"[0:v][ovl]overlay=x=(W-w)/2:y=(H-h)/2:shortest=1:format=auto"
+             f"{',' + vf if vf else ''},format=yuv420p[outv]")
+    cmd = ["ffmpeg", "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+           "-stream_loop", "-1", "-i", overlay_path,
+           "-filter_complex", graph, "-map", "[outv]",
+           "-c:v", codec, "-preset", preset, *codec_params, "-movflags", "+faststart"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(out_file)
+    
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=PIPE_SIZE)
+    _widen_pipe(proc.stdin)
+    try:
+        for frame in clip.iter_frames(fps=fps, dtype="uint8"):
+            proc.stdin.write(np.ascontiguousarray(frame).data)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its return code says why
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg could not composite the overlay onto {out_file}")
+
+def _widen_pipe(pipe):
+    """
+    Grow pipe's kernel buffer to PIPE_SIZE where the OS allows it (Linux), so
+    a 1080x1920 frame crosses in a few large writes instead of 64 KiB steps.
+    """
+    try:
+        import fcntl
+        fcntl.fcntl(pipe.fileno(), fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+    except (ImportError, AttributeError, OSError):
+        pass  # Not Linux, or above /proc/sys/fs/pipe-max-size - keep the default
+
+def _run_ffmpeg(cmd, duration=None, on_progress=None):
+    """
+    Run an ffmpeg command (a list starting with "ffmpeg") and return its exit code.
+    
+    Given on_progress and the output duration in seconds, ffmpeg's
+    -progress key=value stream is read (about one update a second) and
+    on_progress(fraction_done) called for each update, rather than reporting
+    progress from Python once per frame.
+    """
+    if on_progress is None or not duration:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+    
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as proc:
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            # out_time_ms is (despite the name) microseconds, like out_time_us
+            if key in ("out_time_us", "out_time_ms") and value.isdigit():
+                on_progress(min(1.0, int(value) / 1e6 / duration))
+    return proc.returncode
+
+def _probe_duration(path):
+    """Return the container duration of a media file in seconds, or None if ffprobe can't read it."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        duration = float(out)
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+    return duration if duration > 0 else None
+
+@lru_cache(maxsize=256)
+def _probe(path):
+    """
+    Probe a media file once with ffprobe and remember the result.
+    
+    Returns:
+        dict: First video stream's ffprobe fields (codec_name, width, height,
+        pix_fmt, ...), or None if the file has no readable video stream
+    """
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_streams", "-of", "json", path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        streams = json.loads(out).get("streams", [])
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+    for stream in streams:
+        if stream.get("codec_type") == "video":
+            return stream
+    return None
+
+def _fit_filter(width, height, size):
+    """
+    Return an ffmpeg filter chain fitting a width x height video to size.
+    
+    Vertical video is scaled to fill and center-cropped, anything else is fit
+    to the width and padded with black, as in ensure_consistent_dimensions.
+    """
+    size = f"{size[0]}:{size[1]}"
+    if height > width:
+        return f"scale={size}:force_original_aspect_ratio=increase,crop={size}"
+    return f"scale={size}:force_original_aspect_ratio=decrease,pad={size}:(ow-iw)/2:(oh-ih)/2:black"
+
+def _prenormalize(video_path, threads=None):
+    """
+    Return a copy of video_path already scaled and padded to 1080x1920 in yuv420p.
+    
+    Normalized copies are kept in NORMALIZED_CACHE_DIR keyed by _file_key and
+    the encode settings, so each source is re-encoded once rather than resized
+    frame by frame in every clip of every batch, even if it is renamed or
+    moved. Sources that are vertical as displayed (after their rotation) are
+    scaled to fill and center-cropped, others are fit to the width and padded
+    with black, matching ensure_consistent_dimensions. Falls back to the
+    original path if the source can't be probed or ffmpeg fails. threads caps
+    the encoder threads (default: one per core).
+    """
+    info = _probe(video_path)
+    if info is None:
+        return video_path
+    width, height = info.get("width"), info.get("height")
+    rotation = _rotation(info)
+    # ffmpeg decodes rotated footage turned upright, so fit its displayed size
+    if rotation % 180 == 90:
+        width, height = height, width
+    if ((width, height) == (NORMALIZED_WIDTH, NORMALIZED_HEIGHT) and not rotation
+            and info.get("pix_fmt") == "yuv420p"):
+        return video_path
+    
+    options = hashlib.blake2b(" ".join(NORMALIZED_X264).encode(), digest_size=4).hexdigest()
+    key = f"{_file_key(video_path)}_{NORMALIZED_WIDTH}x{NORMALIZED_HEIGHT}_crf{NORMALIZED_CRF}_{options}"
+    cached = os.path.join(NORMALIZED_CACHE_DIR, f"{key}.mp4")
+    try:
+        # Mark the copy as recently used for _evict_normalized_cache
+        os.utime(cached)
+        return cached
+    except OSError:
+        pass
+    
+    vf = _fit_filter(width, height, (NORMALIZED_WIDTH, NORMALIZED_HEIGHT))
+    
+    os.makedirs(NORMALIZED_CACHE_DIR, exist_ok=True)
+    partial = os.path.join(NORMALIZED_CACHE_DIR, f"{key}.part.mp4")
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-i", video_path, "-vf", vf + ",setsar=1",
+         "-c:v", "libx264", "-preset", "veryfast", "-crf", str(NORMALIZED_CRF), *NORMALIZED_X264,
+         "-threads", str(threads or 0), "-pix_fmt", "yuv420p", "-c:a", "aac", partial],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        if os.path.exists(partial):
+            os.remove(partial)
+        return video_path
+    os.replace(partial, cached)
+    return cached
+
+def _evict_normalized_cache(keep=(), max_bytes=NORMALIZED_CACHE_MAX_BYTES):
+    """
+    Delete the least recently used normalized copies (by mtime, which
+    _prenormalize refreshes on every hit) until NORMALIZED_CACHE_DIR holds at
+    most max_bytes. Paths in keep are never deleted, nor are partial encodes
+    younger than a day (another batch may still be writing them).
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    try:
+        with os.scandir(NORMALIZED_CACHE_DIR) as entries:
+            files = [(entry.path, entry.stat()) for entry in entries if entry.is_file()]
+    except OSError:
+        return
+    
+    total = sum(st.st_size for _, st in files)
+    stale = time.time() - 24 * 60 * 60
+    for path, st in sorted(files, key=lambda item: item[1].st_mtime):
+        is_partial = path.endswith(".part.mp4")
+        if is_partial and st.st_mtime >= stale:
+            continue
+        if not is_partial and (total <= max_bytes or os.path.abspath(path) in keep):
+            continue
+        try:
+            os.remove(path)
+            total -= st.st_size
+        except OSError:
+            pass
+
+@lru_cache(maxsize=1)
+def _pick_codec():
+    """
+    Choose the H.264 encoder for renders: a hardware encoder when this machine
+    and its ffmpeg build have one, otherwise libx264.
+    
+    Returns:
+        tuple: (codec, preset, ffmpeg_params) for write_videofile
+    """
+    try:
+        encoders = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                  capture_output=True, text=True).stdout
+    except OSError:
+        encoders = ""
+    system = platform.system()
+    
+    # Apple media engine; VideoToolbox has no CRF mode, so use a bitrate target
+    if system == "Darwin" and "h264_videotoolbox" in encoders:
+        return "h264_videotoolbox", "medium", ["-b:v", "6M", "-allow_sw", "1"]
+    
+    if "h264_nvenc" in encoders and shutil.which("nvidia-smi"):
+        if subprocess.run(["nvidia-smi"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            return "h264_nvenc", "p4", ["-tune", "hq", "-rc", "vbr", "-cq", "23", "-b:v", "0"]
+    
+    if system == "Linux" and "h264_qsv" in encoders and os.path.exists("/dev/dri/renderD128"):
+        return "h264_qsv", "veryfast", ["-global_quality", "23"]
+    
+    # veryfast encodes several times quicker than fast for a small size cost
+    return "libx264", "veryfast", ["-crf", "23"]
+
+def _encode_audio_track(audio_path, duration, out_file):
+    """
+    Encode audio_path to an AAC track of `duration` seconds, looping short input.
+    
+    Returns:
+        str: out_file, or None if ffmpeg failed
+    """
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-stream_loop", "-1", "-i", audio_path, "-t", f"{duration:.3f}",
+         "-vn", "-c:a", "aac", "-b:a", "192k", out_file],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return out_file if result.returncode == 0 else None
+
+def _finish_output(video_path, output_path, audio_track=None, copy_audio=True):
+    """
+    Move a rendered video into place, muxing in audio_track if given.
+    
+    The audio is looped or trimmed to the video and stream-copied, or encoded
+    to AAC when copy_audio is False.
+    
+    Without audio the file is renamed with os.replace, so video_path should be
+    on the same filesystem as output_path. If ffmpeg can't mux the audio, the
+    video is kept without it.
+    
+    Returns:
+        bool: False if audio_track was given but could not be added
+    """
+    if not audio_track:
+        os.replace(video_path, output_path)
+        return True
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-i", video_path, "-stream_loop", "-1", "-i", audio_track,
+         "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "copy" if copy_audio else "aac", "-shortest",
+         "-movflags", "+faststart", output_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        print(f"Error adding audio from {audio_track}: ffmpeg could not mux it")
+        os.replace(video_path, output_path)
+        return False
+    os.remove(video_path)
+    return True
+
+def _concat_copy(segments, audio_path, out_file, size, copy_audio=False):
+    """
+    Join (path, start, end) segments with ffmpeg's concat demuxer and stream copy.
+    
+    Only possible when every source shares one codec, profile, pixel format and
+    time base and is already `size`, so nothing has to be resized or padded and
+    the copied packets decode as a single stream. Cuts snap to the
+    nearest keyframe. The video stream is copied; audio_path (looped or trimmed
+    to the video) is encoded to AAC, or copied as-is with copy_audio, otherwise
+    the source audio is copied.
+    
+    Returns:
+        bool: True if out_file was written, False if the caller must re-encode
+    """
+    streams = set()
+    for path in {seg[0] for seg in segments}:
+        info = _probe(path)
+        if info is None:
+            return False
+        streams.add((info.get("codec_name"), info.get("profile"), info.get("width"), info.get("height"),
+                     info.get("pix_fmt"), info.get("time_base")))
+    if len(streams) != 1:
+        return False
+    _, _, width, height, _, _ = streams.pop()
+    if (width, height) != tuple(size):
+        return False
+    
+    fd, list_path = tempfile.mkstemp(suffix="_concat.txt")
+    try:
+        with os.fdopen(fd, "w") as f:
+            for path, start, end in segments:
+                quoted = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{quoted}'\ninpoint {start:.3f}\noutpoint {end:.3f}\n")
         
-        for clip in selected_clips:
-            clip.close()
+        cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        if audio_path:
+            cmd += ["-stream_loop", "-1", "-i", audio_path,
+                    "-map", "0:v", "-map", "1:a", "-c:v", "copy",
+                    "-c:a", "copy" if copy_audio else "aac", "-shortest"]
+        else:
+            cmd += ["-map", "0:v", "-map", "0:a?", "-c", "copy"]
+        cmd += ["-movflags", "+faststart", out_file]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode == 0
+    finally:
+        os.remove(list_path)
+
+def _concat_filter(segments, audio_path, out_file, size, copy_audio=False, on_progress=None, *,
+                   segment_filters=None, crossfades=None, post_filter=None, overlay_path=None,
+                   caption=None, duration=None, threads=None):
+    """
+    Cut, fit and join (path, start, end) segments in one ffmpeg filter graph.
     
-    # Clean up
-    for clip in input_clips:
-        clip.close()
+    Each segment is trimmed and scaled/cropped or padded to `size` with
+    _fit_filter, then everything is concatenated and encoded once with the
+    _pick_codec encoder. audio_path is looped or trimmed to the video and
+    encoded to AAC, or copied as-is with copy_audio. on_progress is passed
+    to _run_ffmpeg.
     
-    # Final progress update
-    if progress_callback:
-        progress_callback(100, f"All {len(output_paths)} videos complete!")
+    segment_filters adds a filter chain to each segment and post_filter one to
+    the joined video. With crossfades, consecutive segments overlap by
+    TRANSITION_OVERLAP seconds like MoviePy's negative concat padding: a True
+    entry cross-fades that segment in over the previous one, False cuts to it.
+    overlay_path is a (transparent) video composited centered on top, scaled
+    to fit without changing its aspect ratio and looped to the video length.
+    caption is a (png_path, y) still from _caption_png, composited centered
+    horizontally with its top at y, under the overlay video. duration is the
+    expected output length for progress reporting, and threads caps the
+    filter and encoder threads (default: ffmpeg's choice).
     
-    return output_paths
+    Returns:
+        bool: True if out_file was written, False if the caller must use MoviePy
+    """
+    paths = list(dict.fromkeys(seg[0] for seg in segments))
+    probes = {path: _probe(path) for path in paths}
+    if any(info is None for info in probes.values()):
+        return False
+    
+    cmd = ["ffmpeg", "-y"]
+    for path in paths:
+        cmd += ["-i", path]
+    cmd += ["-stream_loop", "-1", "-i", audio_path]
+    if overlay_path:
+        cmd += ["-stream_loop", "-1", "-i", overlay_path]
+    if caption:
+        cmd += ["-loop", "1", "-i", caption[0]]
+    
+    chains = []
+    for k, (path, start, end) in enumerate(segments):
+        # A hard cut into the next segment hides the last part of this one
+        if crossfades and k + 1 < len(segments) and not crossfades[k + 1]:
+            end = max(start + TRANSITION_OVERLAP, end - TRANSITION_OVERLAP)
+        info = probes[path]
+        fit = _fit_filter(info.get("width"), info.get("height"), size)
+        extra = f",{segment_filters[k]}" if segment_filters and segment_filters[k] else ""
+        chains.append(
+            f"[{paths.index(path)}:v]trim=start={start:.3f}:end={end:.3f},setpts=PTS-STARTPTS,"
+            f"fps=30,format=yuv420p,{fit},setsar=1{extra}[v{k}]"
+        )
+    
+    if crossfades:
+        # Join pairwise so each boundary can be a cross-fade or a cut
+        joined = "v0"
+        length = segments[0][2] - segments[0][1]
+        for k in range(1, len(segments)):
+            if crossfades[k]:
+                chains.append(f"[{joined}][v{k}]xfade=transition=fade:duration={TRANSITION_OVERLAP}:"
+                              f"offset={length - TRANSITION_OVERLAP:.3f}[j{k}]")
+            else:
+                chains.append(f"[{joined}][v{k}]concat=n=2:v=1:a=0[j{k}]")
+            length += segments[k][2] - segments[k][1] - TRANSITION_OVERLAP
+            joined = f"j{k}"
+    else:
+        inputs = "".join(f"[v{k}]" for k in range(len(segments)))
+        chains.append(f"{inputs}concat=n={len(segments)}:v=1:a=0[j]")
+        joined = "j"
+    if overlay_path or caption:
+        width, height = size
+        chains.append(f"[{joined}]{post_filter or 'null'}[main]")
+        layered = "main"
+        if caption:
+            chains.append(f"[main][{len(paths) + 1 + bool(overlay_path)}:v]"
+                          f"overlay=x=(W-w)/2:y={caption[1]:.0f}:shortest=1:format=auto[txt]")
+            layered = "txt"
+        if overlay_path:
+            chains.append(f"[{len(paths) + 1}:v]scale={width}:{height}:force_original_aspect_ratio=decrease[ovl]")
+            chains.append(f"[{layered}][ovl]overlay=x=(W-w)/2:y=(H-h)/2:shortest=1:format=auto[ovd]")
+            layered = "ovd"
+        chains.append(f"[{layered}]format=yuv420p[outv]")
+    else:
+        chains.append(f"[{joined}]{post_filter or 'null'}[outv]")
+    graph = ";".join(chains)
+    
+    codec, preset, codec_params = _pick_codec()
+    cmd += ["-filter_complex", graph, "-map", "[outv]", "-map", f"{len(paths)}:a",
+            "-c:v", codec, "-preset", preset] + codec_params
+    if threads:
+        cmd += ["-threads", str(threads), "-filter_complex_threads", str(threads)]
+    cmd += ["-c:a", "copy" if copy_audio else "aac", "-shortest", "-movflags", "+faststart", out_file]
+    if duration is None:
+        duration = sum(end - start for _, start, end in segments)
+    return _run_ffmpeg(cmd, duration, on_progress) == 0
+
+def _effects_graph(segments, segment_effects, use_fx, style, intensity, speed_factor, target_duration):
+    """
+    Return the _concat_filter keyword arguments that reproduce the MoviePy
+    effects pipeline of _render_one as ffmpeg filters.
+    
+    With use_fx: 0.4s fades at both ends, the 1.03 colour boost plus each
+    segment's _pick_smart_effect choice (in yuv420p, see _gain_filter),
+    overlapping joins and the _effects_filter grade. A speed_factor other
+    than 1 changes the playback speed, repeating the sequence if it ends up
+    short, and trims to target_duration.
+    """
+    segment_filters = None
+    crossfades = None
+    post = []
+    length = sum(end - start for _, start, end in segments)
+    
+    if use_fx:
+        segment_filters = []
+        crossfades = []
+        for k, ((_, start, end), effect) in enumerate(zip(segments, segment_effects)):
+            gain = 1.03
+            if effect and effect[0] == "colorx":
+                gain *= effect[1]
+            chain = [_gain_filter(gain)]
+            if k == 0:
+                chain.append("fade=t=in:st=0:d=0.4")
+            if k == len(segments) - 1:
+                chain.append(f"fade=t=out:st={max(0.0, end - start - 0.4):.3f}:d=0.4")
+            segment_filters.append(",".join(chain))
+            crossfades.append(bool(effect and effect[0] == "crossfadein"))
+        length -= TRANSITION_OVERLAP * (len(segments) - 1)
+    
+    if abs(speed_factor - 1.0) > 0.01:
+        # Loop the whole sequence when speeding up leaves it short
+        repeats = max(1, int(np.ceil(target_duration * speed_factor / length)))
+        if repeats > 1:
+            segments = segments * repeats
+            segment_filters = segment_filters * repeats if segment_filters else None
+            crossfades = crossfades * repeats if crossfades else None
+        length = min(target_duration, length * repeats / speed_factor)
+        post.append(f"setpts=PTS/{speed_factor},fps=30,trim=duration={target_duration:.3f}")
+    
+    if use_fx:
+        grade = _effects_filter(style, intensity)
+        if grade:
+            post.append(grade)
+    post.append("format=yuv420p")
+    
+    return dict(segments=segments, segment_filters=segment_filters, crossfades=crossfades,
+                post_filter=",".join(post), duration=length)
+
+def _gain_filter(gain):
+    """
+    Return a filter multiplying R, G and B by gain (MoviePy's colorx) that
+    works on yuv420p directly: scaling RGB equals scaling luma above black
+    and chroma around neutral, so frames never get converted to RGB.
+    """
+    return (f"lutyuv=y='clip((val-16)*{gain:.3f}+16,16,235)'"
+            f":u='clip((val-128)*{gain:.3f}+128,16,240)'"
+            f":v='clip((val-128)*{gain:.3f}+128,16,240)'")
+
+def _effects_filter(style, t):
+    """
+    Return FFmpeg filter string based on style and normalized intensity t (0-1).
+    
+    eq, noise and tblend have no CUDA versions, so this always runs on the CPU
+    before the encoder; with NVENC that is one upload per frame, not a
+    download/upload round trip around every filter.
+    """
+    t = max(0.0, min(t, 1.0))
+    if t < 0.05:  # practically no effect
+        return None
+
+    if style == "classic":
+        brightness = round(0.0 + 0.10 * t, 3)  # up to +0.10
+        saturation = round(1.0 + 1.5 * t, 2)   # up to 2.5x
+        return f"eq=brightness={brightness}:saturation={saturation}"
+
+    if style == "graincore":
+        contrast = round(1.0 + 4.0 * t, 2)      # 1-5
+        brightness = round(-0.2 * t, 2)         # 0 to -0.2
+        noise = int(20 + 180 * t)               # 20-200
+        opacity = round(0.1 + 0.8 * t, 2)       # 0.1-0.9
+        return (
+            f"format=gray,eq=contrast={contrast}:brightness={brightness},"
+            f"noise=alls={noise}:allf=u+random,"  # static flicker
+            f"tblend=all_mode=difference:opacity={opacity},format=yuv420p"
+        )
+
+    # Fallback minimal adjustment
+    return "eq=brightness=0:saturation=1"
 
 def apply_smart_effects(clip, intensity=0.3):
     """
     Apply minimal effects to avoid freezing issues.
     """
+    return _apply_smart_effect(clip, _pick_smart_effect(intensity))
+
+def _pick_smart_effect(intensity=0.3):
+    """
+    Choose the effect apply_smart_effects uses: ("colorx", factor),
+    ("crossfadein", seconds) or None. Kept separate so the ffmpeg render
+    can apply the same choice as a filter.
+    """
     # Only attempt one simple effect
-    effect_choice = random.random()
+    effect_choice = _rng.random()
+    
+    if effect_choice < 0.4:  # 40% chance of slight color boost
+        return ("colorx", 1.0 + (intensity * 0.2))
+    elif effect_choice < 0.6:  # 20% chance of slight fade
+        return ("crossfadein", TRANSITION_OVERLAP)
+    else:  # 40% chance of no effect
+        return None
+
+def _apply_smart_effect(clip, effect):
+    """Apply a _pick_smart_effect choice to a MoviePy clip."""
+    from moviepy.video.fx.colorx import colorx
     
     try:
-        if effect_choice < 0.4:  # 40% chance of slight color boost
-            return colorx(clip, 1.0 + (intensity * 0.2))
-        elif effect_choice < 0.6:  # 20% chance of slight fade
-            return clip.crossfadein(0.3)
-        else:  # 40% chance of no effect
+        if effect is None:
             return clip
+        if effect[0] == "colorx":
+            return colorx(clip, effect[1])
+        return clip.crossfadein(effect[1])
     except Exception as e:
         print(f"Effect failed, returning original clip: {e}")
         return clip
 
+def _pick_caption(custom_text, i):
+    """Return custom_text, or a random short-form caption for video i."""
+    if custom_text:
+        return custom_text
+    captions = [
+        "WATCH TILL THE END 😱",
+        "POV: When the beat drops 🔥",
+        "This is INSANE 🤯",
+        "Wait for it... 👀",
+        "Best moments 💯",
+        "Try not to be amazed 😮",
+        "Crazy skills 💪",
+        "Ultimate compilation 🏆",
+        "The perfect edit doesn't exi- 😲",
+        "Caught in 4K 📸",
+        "Vibe check ✅",
+        f"Part {i+1} 🎬"
+    ]
+    return _pick(captions, _rng.random())
+
+def _font_candidates(font_name, bold, italic):
+    """Return the font names to try for the style flags, best match first."""
+    candidates = []
+    base = font_name
+    if bold and italic:
+        candidates += [f"{base}-BoldItalic", f"{base} Bold Italic", f"{base}-BoldOblique"]
+    if bold and not italic:
+        candidates += [f"{base}-Bold", f"{base} Bold"]
+    if italic and not bold:
+        candidates += [f"{base}-Italic", f"{base} Italic", f"{base}-Oblique"]
+    # Always add base font last as fallback
+    candidates.append(base)
+    return tuple(candidates)
+
+def _text_y(position, clip_height, text_height):
+    """Return the top edge of text_height-tall text placed in the given third."""
+    if position in ("bottom", "lower"):
+        return clip_height * 5 / 6 - text_height / 2  # center of bottom third
+    if position in ("top", "upper"):
+        return clip_height / 6 - text_height / 2  # center of top third
+    return (clip_height - text_height) / 2
+
+def _caption_png(caption, clip_size, position, *, font_name, bold, italic, underline):
+    """
+    Rasterize caption the way create_text_overlay does and save it as a PNG
+    in CAPTION_CACHE_DIR for ffmpeg to composite.
+    
+    The PNG is keyed by the caption and its style, so videos (and batches)
+    showing the same caption reuse one file.
+    
+    Returns:
+        tuple: (png_path, y) with y the text's top edge, or None if PIL can't
+        load the font (MoviePy's TextClip has to draw it then)
+    """
+    from PIL import Image
+    
+    rgba = _rasterize_caption(caption, clip_size[0] - 40, _font_candidates(font_name, bold, italic),
+                              int(clip_size[0] * 0.07), "white", "black", 2, underline)
+    if rgba is None:
+        return None
+    key = hashlib.blake2b(repr((caption, clip_size, font_name, bold, italic, underline)).encode(),
+                          digest_size=16).hexdigest()
+    path = os.path.join(CAPTION_CACHE_DIR, f"caption_{key}.png")
+    if not os.path.exists(path):
+        os.makedirs(CAPTION_CACHE_DIR, exist_ok=True)
+        # Written under a unique name first, as parallel workers may race here
+        fd, partial = tempfile.mkstemp(suffix=".png", dir=CAPTION_CACHE_DIR)
+        os.close(fd)
+        Image.fromarray(rgba).save(partial, compress_level=1)
+        os.replace(partial, path)
+    return path, _text_y(position, clip_size[1], rgba.shape[0])
+
 def create_text_overlay(text, clip_size, position="top", *,
                         font_name="Arial", bold=False, italic=False, underline=False,
                         fontsize=70, color="white", bg_color=None, stroke_color="black", stroke_width=2):
@@ -821,63 +1756,57 @@ def create_text_overlay(text, clip_size, position="top", *,
         stroke_width: Outline width
         
     Returns:
-        TextClip object ready to be composited
+        Clip ready to be composited
+    
+    The caption is rasterized once with PIL into an RGBA ImageClip; MoviePy's
+    TextClip (ImageMagick) is only used when PIL can't load the font.
     """
+    from moviepy.editor import CompositeVideoClip, TextClip, ColorClip, ImageClip
+    
     try:
         # Build candidate fonts list based on style flags
-        candidates = []
-        base = font_name
-        if bold and italic:
-            candidates += [f"{base}-BoldItalic", f"{base} Bold Italic", f"{base}-BoldOblique"]
-        if bold and not italic:
-            candidates += [f"{base}-Bold", f"{base} Bold"]
-        if italic and not bold:
-            candidates += [f"{base}-Italic", f"{base} Italic", f"{base}-Oblique"]
-        # Always add base font last as fallback
-        candidates.append(base)
-
-        txt = None
-        last_exc = None
-        for cand_font in candidates:
-            try:
-                txt = TextClip(
-                    text,
-                    font=cand_font,
-                    fontsize=fontsize,
-                    color=color,
-                    stroke_color=stroke_color,
-                    stroke_width=stroke_width,
-                    method='caption',
-                    align='center',
-                    size=(clip_size[0] - 40, None)
-                )
-                break  # Success
-            except Exception as e:
-                last_exc = e
-                continue
-        if txt is None:
-            raise last_exc if last_exc else Exception("Unable to create TextClip with provided font")
+        candidates = _font_candidates(font_name, bold, italic)
 
-        # Add underline if requested
-        if underline:
-            try:
-                line_height = max(4, int(fontsize * 0.08))
-                underline_clip = ColorClip(size=(txt.w, line_height), color=color)
-                underline_clip = underline_clip.set_position(("center", txt.h - int(line_height/2)))
-                txt = CompositeVideoClip([txt, underline_clip], size=(txt.w, txt.h + line_height))
-            except Exception as ue:
-                print(f"Warning: underline failed: {ue}")
+        rgba = _rasterize_caption(text, clip_size[0] - 40, candidates, fontsize, color,
+                                  stroke_color, stroke_width, underline)
+        if rgba is not None:
+            txt = ImageClip(rgba, transparent=True)
+        else:
+            txt = None
+            last_exc = None
+            for cand_font in candidates:
+                try:
+                    txt = TextClip(
+                        text,
+                        font=cand_font,
+                        fontsize=fontsize,
+                        color=color,
+                        stroke_color=stroke_color,
+                        stroke_width=stroke_width,
+                        method='caption',
+                        align='center',
+                        size=(clip_size[0] - 40, None)
+                    )
+                    break  # Success
+                except Exception as e:
+                    last_exc = e
+                    continue
+            if txt is None:
+                raise last_exc if last_exc else Exception("Unable to create TextClip with provided font")
+
+            # Add underline if requested
+            if underline:
+                try:
+                    line_height = max(4, int(fontsize * 0.08))
+                    underline_clip = ColorClip(size=(txt.w, line_height), color=color)
+                    underline_clip = underline_clip.set_position(("center", txt.h - int(line_height/2)))
+                    txt = CompositeVideoClip([txt, underline_clip], size=(txt.w, txt.h + line_height))
+                except Exception as ue:
+                    print(f"Warning: underline failed: {ue}")
 
         # Positioning within thirds
         try:
-            if position in ("bottom", "lower"):
-                y_pos = clip_size[1] * 5 / 6 - txt.h / 2  # center of bottom third
-                txt = txt.set_position(("center", y_pos))
-            elif position in ("top", "upper"):
-                y_pos = clip_size[1] / 6 - txt.h / 2  # center of top third
-                txt = txt.set_position(("center", y_pos))
-            else:  # center
-                txt = txt.set_position("center")
+            txt = txt.set_position(("center", _text_y(position, clip_size[1], txt.h)))
         except Exception as pe:
             print(f"Warning positioning text: {pe}")
 
@@ -886,6 +1815,63 @@ def create_text_overlay(text, clip_size, position="top", *,
         print(f"Error positioning text: {str(e)}")
         return None
 
+@lru_cache(maxsize=32)
+def _rasterize_caption(text, width, fonts, fontsize, color, stroke_color, stroke_width, underline):
+    """
+    Draw text word-wrapped and centered in a `width`-wide transparent image,
+    like TextClip's caption method, using the first of fonts PIL can load.
+    
+    Cached, since every video of a batch usually shows the same caption.
+    
+    Returns:
+        np.ndarray: Read-only (h, width, 4) uint8 RGBA image, or None if none
+        of the fonts could be loaded
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    
+    font = None
+    for name in fonts:
+        try:
+            font = ImageFont.truetype(name, fontsize)
+            break
+        except OSError:
+            continue
+    if font is None:
+        return None
+    
+    # Greedy word wrap to the caption width
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) + 2 * stroke_width > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent + stroke_width * 2
+    underline_height = max(4, int(fontsize * 0.08)) if underline else 0
+    height = line_height * len(lines) + underline_height
+    
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for k, line in enumerate(lines):
+        line_width = font.getlength(line)
+        draw.text(((width - line_width) / 2, k * line_height + stroke_width), line, font=font,
+                  fill=color, stroke_width=stroke_width, stroke_fill=stroke_color)
+    if underline:
+        text_width = max(font.getlength(line) for line in lines)
+        left = (width - text_width) / 2
+        draw.rectangle([left, height - underline_height, left + text_width, height - 1], fill=color)
+    
+    rgba = np.asarray(img)
+    rgba.flags.writeable = False
+    return rgba
+
 # Add a function to preserve original dimensions 
 def preserve_original_dimensions(original_clip, processed_clip):
     """
@@ -917,6 +1903,8 @@ def ensure_consistent_dimensions(clip, target_ratio=(9, 16)):
     For 9:16 videos, ensure they fill the screen with no black bars.
     For other ratios, add minimal black bars as needed.
     """
+    from moviepy.video.fx.crop import crop
+    
     if clip is None:
         raise ValueError("Clip cannot be None")
         
@@ -927,6 +1915,10 @@ def ensure_consistent_dimensions(clip, target_ratio=(9, 16)):
     # Get current dimensions
     w, h = clip.size
     
+    # Pre-normalized sources are already the right size
+    if (w, h) == (TARGET_WIDTH, TARGET_HEIGHT):
+        return clip
+    
     # For vertical videos (taller than wide)
     if h > w:  # This is a vertical video
         # Resize to fixed 9:16 dimensions (1080x1920)
@@ -961,7 +1953,7 @@ def ensure_consistent_dimensions(clip, target_ratio=(9, 16)):
         return resized.margin(top=padding_y, bottom=padding_y, color=(0, 0, 0))
 
 # Helper function to select a clip that is visually dissimilar to recently used clips
-def select_dissimilar_clip(available_indices, recently_used, visual_signatures, top_n=3):
+def select_dissimilar_clip(available_indices, recently_used, visual_signatures, top_n=3, similarity=None):
     """
     Select a clip that is visually dissimilar to recently used clips.
     
@@ -969,132 +1961,184 @@ def select_dissimilar_clip(available_indices, recently_used, visual_signatures,
         available_indices: List of available clip indices to choose from
         recently_used: List of recently used clip indices
         visual_signatures: Dictionary of clip signatures for comparison
-        top_n: Number of candidates to consider
+        top_n: Number of most dissimilar clips to choose from
+        similarity: Optional (row_of, matrix) pair from similarity_matrix, so
+            callers picking many clips compute the matrix only once
         
     Returns:
         Index of selected clip
     """
     # If no recently used clips or no signatures, choose randomly
     if not recently_used or not visual_signatures:
-        return random.choice(available_indices)
-    
-    # Select a few random candidates
-    candidates = random.sample(
-        available_indices, 
-        min(top_n, len(available_indices))
-    )
+        return _pick(available_indices, _rng.random())
     
-    # Calculate average dissimilarity score for each candidate
-    scores = []
-    for candidate in candidates:
-        # Skip if candidate doesn't have a signature
-        if candidate not in visual_signatures:
-            scores.append(0)
-            continue
-            
-        # Calculate average dissimilarity to recently used clips
-        dissimilarity = 0
-        count = 0
-        for used in recently_used:
-            if used in visual_signatures:
-                # Higher score means more dissimilar
-                dissimilarity += 1.0 - calculate_similarity(
-                    visual_signatures[candidate],
-                    visual_signatures[used]
-                )
-                count += 1
-        
-        # Average dissimilarity (higher is better)
-        avg_dissimilarity = dissimilarity / count if count > 0 else 0
-        scores.append(avg_dissimilarity)
+    if similarity is None:
+        similarity = similarity_matrix(visual_signatures)
+    row_of, matrix = similarity
     
-    # Select the most dissimilar candidate
-    if scores:
-        # Return the candidate with highest dissimilarity score
-        return candidates[scores.index(max(scores))]
+    # Average dissimilarity of every available clip to the recently used
+    # clips (higher is better); clips without a signature score 0
+    used_rows = [row_of[used] for used in recently_used if used in row_of]
+    scores = np.zeros(len(available_indices))
+    if used_rows:
+        known = [k for k, index in enumerate(available_indices) if index in row_of]
+        rows = [row_of[available_indices[k]] for k in known]
+        scores[known] = 1.0 - matrix[np.ix_(rows, used_rows)].mean(axis=1)
     
-    # Fallback to random selection
-    return random.choice(available_indices)
+    # Choose randomly among the top_n most dissimilar clips, for variety
+    top_n = min(top_n, len(available_indices))
+    best = np.argpartition(scores, -top_n)[-top_n:]
+    return available_indices[int(_rng.choice(best))]
+
+def similarity_matrix(visual_signatures):
+    """
+    Return (row_of, matrix) where matrix[row_of[a], row_of[b]] is the
+    calculate_similarity of clips a and b, computed for every pair at once
+    (SIMILARITY_BLOCK_ROWS rows at a time).
+    """
+    keys = sorted(visual_signatures)
+    sigs = np.stack([np.asarray(visual_signatures[k], dtype=np.uint64) for k in keys])
+    matrix = np.empty((len(keys), len(keys)), dtype=np.float32)
+    for start in range(0, len(keys), SIMILARITY_BLOCK_ROWS):
+        block = sigs[start:start + SIMILARITY_BLOCK_ROWS]
+        matrix[start:start + len(block)] = calculate_similarity(block[:, None], sigs[None])
+    return {k: row for row, k in enumerate(keys)}, matrix
 
 # Calculate similarity between two visual signatures
 def calculate_similarity(sig1, sig2):
     """
     Calculate similarity between two visual signatures.
     Returns a value between 0 and 1, where 1 is identical.
-    """
-    # Simple implementation: use cosine similarity
-    # Convert to numpy arrays if they aren't already
-    sig1 = np.array(sig1)
-    sig2 = np.array(sig2)
     
-    # Calculate cosine similarity
-    dot_product = np.dot(sig1, sig2)
-    norm1 = np.linalg.norm(sig1)
-    norm2 = np.linalg.norm(sig2)
-    
-    # Avoid division by zero
-    if norm1 == 0 or norm2 == 0:
-        return 0
-        
-    return dot_product / (norm1 * norm2)
+    Signatures are sequences of 64-bit frame hashes, compared by the share
+    of matching bits. Stacks of signatures broadcast like NumPy arrays.
+    """
+    diff = np.bitwise_xor(np.asarray(sig1, dtype=np.uint64), np.asarray(sig2, dtype=np.uint64))
+    # Count differing bits over every hash of the signature (the last axis)
+    bytes_ = diff.view(np.uint8).reshape(diff.shape[:-1] + (-1,))
+    bits = _POPCOUNT[bytes_].sum(axis=-1, dtype=np.float32)
+    return (1.0 - bits / (64 * diff.shape[-1]))[()]
 
 # Create simple visual signatures for videos
 def create_video_signatures(clips, samples=5):
     """
     Create simple visual signatures for a list of video clips.
-    This is a simplified approach - in production, you'd use more sophisticated
-    visual feature extraction.
+    Each signature is a 64-bit difference hash (see _dhash) per sampled
+    frame, so clips compare by structure rather than by average colour.
     
     Args:
-        clips: List of MoviePy VideoFileClip objects
+        clips: List of SourceVideos (or MoviePy VideoFileClips)
         samples: Number of frames to sample from each clip
         
     Returns:
-        Dictionary mapping clip index to signature
+        Dictionary mapping clip index to signature (a uint64 array)
+    
+    Signatures are cached in SIGNATURE_CACHE_DIR by _file_key, so unchanged
+    sources are not decoded again in later batches.
     """
     signatures = {}
     
+    cache_paths = {}
     for i, clip in enumerate(clips):
         try:
-            # Sample frames evenly throughout the clip
-            duration = clip.duration
-            if duration <= 0:
-                continue
-                
-            frame_times = np.linspace(0, duration * 0.9, samples)
-            
-            # Extract color features from each frame
-            signature = []
-            for t in frame_times:
-                try:
-                    # Get frame at this time
-                    frame = clip.get_frame(t)
-                    
-                    # Simple color histogram as signature
-                    # Average color values in each channel
-                    r_avg = np.mean(frame[:, :, 0])
-                    g_avg = np.mean(frame[:, :, 1])
-                    b_avg = np.mean(frame[:, :, 2])
-                    
-                    # Calculate dominant brightness
-                    brightness = (r_avg + g_avg + b_avg) / 3
-                    
-                    # Add to signature
-                    signature.extend([r_avg, g_avg, b_avg, brightness])
-                    
-                except Exception:
-                    # If we can't get a frame, add zeros
-                    signature.extend([0, 0, 0, 0])
-            
-            # Store normalized signature
-            signatures[i] = signature
-            
-        except Exception:
+            cache_paths[i] = os.path.join(SIGNATURE_CACHE_DIR, f"dhash_{_file_key(clip.filename)}_{samples}.npy")
+            signatures[i] = np.load(cache_paths[i])
+        except (OSError, ValueError, AttributeError):
+            pass  # Not cached (or no file behind the clip) - sample it below
+    
+    # Each clip is a separate ffmpeg decode, so sample them in parallel
+    missing = [i for i in range(len(clips)) if i not in signatures]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        frame_sets = list(executor.map(lambda i: _sample_frames(clips[i], samples), missing))
+    
+    for i, frames in zip(missing, frame_sets):
+        if frames is None:
             # If we can't process a clip, skip it
             continue
+        
+        # Frames that could not be decoded count as zero hashes
+        signature = np.zeros(samples, dtype=np.uint64)
+        signature[:len(frames)] = _dhash(frames)
+        signatures[i] = signature
+        
+        if i in cache_paths:
+            try:
+                os.makedirs(SIGNATURE_CACHE_DIR, exist_ok=True)
+                np.save(cache_paths[i], signature)
+            except OSError:
+                pass  # Caching is best effort
     
     return signatures
 
+def _dhash(frames):
+    """
+    Return the 64-bit difference hash of each (h, w, 3) frame as uint64.
+    
+    Each frame is reduced to 9x8 grey block means; every bit records whether
+    a block is brighter than its left neighbour.
+    """
+    gray = frames.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    n, height, width = gray.shape
+    rows = np.linspace(0, height, 9).astype(int)[:-1]
+    cols = np.linspace(0, width, 10).astype(int)[:-1]
+    # Block sums divided by block areas, as frames need not divide evenly
+    blocks = np.add.reduceat(np.add.reduceat(gray, rows, axis=1), cols, axis=2)
+    blocks /= np.outer(np.diff(rows, append=height), np.diff(cols, append=width))
+    bits = blocks[:, :, 1:] > blocks[:, :, :-1]
+    return np.packbits(bits.reshape(n, 64), axis=1).view(">u8").astype(np.uint64).ravel()
+
+def _file_key(path, chunk=1 << 20):
+    """
+    Return a cheap content key for path: a blake2b hash of its first and last
+    MiB plus its size and mtime, so unchanged files map to the same key.
+    """
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(chunk))
+        if st.st_size > chunk:
+            f.seek(-min(chunk, st.st_size - chunk), os.SEEK_END)
+            h.update(f.read())
+    return f"{h.hexdigest()}_{st.st_size}_{st.st_mtime_ns}"
+
+def _sample_frames(clip, samples, size=(9, 8)):
+    """
+    Return up to samples frames spread over the clip as an (n, h, w, 3)
+    uint8 array, or None if the clip can't be read.
+    
+    ffmpeg decodes the file once and shrinks each picked frame to the
+    (width, height) size (area averaging keeps the block means) instead of
+    MoviePy seeking and piping out a full-resolution frame per sample.
+    """
+    duration = clip.duration
+    if not duration or duration <= 0:
+        return None
+    
+    width, height = size
+    cmd = [
+        "ffmpeg", "-v", "error", "-i", clip.filename,
+        "-vf", f"fps={samples / duration:.6f},scale={width}:{height}:flags=area",
+        "-frames:v", str(samples), "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"
+    ]
+    try:
+        data = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        data = b""
+    
+    frame_bytes = width * height * 3
+    if len(data) >= frame_bytes:
+        count = len(data) // frame_bytes
+        # A view over ffmpeg's output; slicing the bytes first would copy them
+        return np.frombuffer(data, dtype=np.uint8, count=count * frame_bytes).reshape(count, height, width, 3)
+    
+    # ffmpeg unavailable or failed - fall back to MoviePy's reader, reading
+    # forward once rather than seeking (and restarting ffmpeg) per sample
+    try:
+        frames = clip.iter_frames(fps=samples / duration, dtype="uint8")
+        return np.stack([frame[::8, ::8] for frame in itertools.islice(frames, samples)])
+    except Exception:
+        return None
+
 # Find available segments in a clip that haven't been used yet
 def find_available_segments(clip_index, desired_duration, clip_duration, 
                            global_history=None, local_history=None, 
@@ -1114,59 +2158,51 @@ def find_available_segments(clip_index, desired_duration, clip_duration,
     Returns:
         List of (start, end) tuples representing available segments
     """
-    if global_history is None:
-        global_history = []
-    if local_history is None:
-        local_history = []
-    
-    # Combine global and local history
-    all_used = global_history + local_history
+    # Combine global and local history into one (n, 2) array
+    all_used = np.asarray([*(global_history if global_history is not None else []),
+                           *(local_history if local_history is not None else [])],
+                          dtype=np.float64).reshape(-1, 2)
     
     # If no used segments, the entire clip is available
-    if not all_used:
+    if not len(all_used):
         return [(0, clip_duration - desired_duration)]
     
-    # Sort used segments by start time
-    used_segments = sorted(all_used, key=lambda x: x[0])
-    
-    # Add buffer around used segments
-    buffered_segments = []
-    for start, end in used_segments:
-        buffered_start = max(0, start - buffer)
-        buffered_end = min(clip_duration, end + buffer)
-        buffered_segments.append((buffered_start, buffered_end))
-    
-    # Merge overlapping segments
-    merged = []
-    for segment in buffered_segments:
-        if not merged or segment[0] > merged[-1][1]:
-            merged.append(segment)
-        else:
-            merged[-1] = (merged[-1][0], max(merged[-1][1], segment[1]))
+    # Sort used segments by start time and add buffer around them
+    all_used = all_used[all_used[:, 0].argsort()]
+    starts = np.maximum(all_used[:, 0] - buffer, 0)
+    ends = np.minimum(all_used[:, 1] + buffer, clip_duration)
+    
+    # Merge overlapping segments: a segment opens a new block when it starts
+    # after everything before it has ended
+    reach = np.maximum.accumulate(ends)
+    opens_block = np.r_[True, starts[1:] > reach[:-1]]
+    block_starts = starts[opens_block]
+    block_ends = reach[np.r_[opens_block[1:], True]]
     
     # Find available segments
     available = []
     
     # Check if there's space before the first used segment
-    if merged[0][0] > desired_duration:
-        available.append((0, merged[0][0]))
+    if block_starts[0] > desired_duration:
+        available.append((0, float(block_starts[0])))
     
     # Check spaces between used segments
-    for i in range(len(merged) - 1):
-        gap_start = merged[i][1]
-        gap_end = merged[i+1][0]
-        
-        if gap_end - gap_start >= desired_duration + min_segment_size:
-            available.append((gap_start, gap_end - desired_duration))
+    gap_starts = block_ends[:-1]
+    gap_ends = block_starts[1:]
+    fits = gap_ends - gap_starts >= desired_duration + min_segment_size
+    available.extend(zip(gap_starts[fits].tolist(), (gap_ends[fits] - desired_duration).tolist()))
     
     # Check if there's space after the last used segment
-    if clip_duration - merged[-1][1] >= desired_duration + min_segment_size:
-        available.append((merged[-1][1], clip_duration - desired_duration))
+    if clip_duration - block_ends[-1] >= desired_duration + min_segment_size:
+        available.append((float(block_ends[-1]), clip_duration - desired_duration))
     
     return available
 
 def apply_graincore_effect(clip):
     """Placeholder graincore effect: add slight noise / BW flicker."""
+    from moviepy.video.fx.blackwhite import blackwhite
+    from moviepy.video.fx.colorx import colorx
+    
     try:
         noisy = clip.fx(colorx, 0.9).fx(blackwhite)
         return noisy
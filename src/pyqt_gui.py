@@ -1,10 +1,10 @@
 import os
 import sys
 import threading
-import platform
-import subprocess
 import shutil
 import json
+import time
+from itertools import islice
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, 
@@ -12,13 +12,17 @@ from PyQt5.QtWidgets import (
     QMessageBox, QGroupBox, QGraphicsDropShadowEffect, QGridLayout, QCheckBox,
     QDesktopWidget, QFontComboBox, QComboBox, QSlider
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread
-from PyQt5.QtGui import QColor, QFont, QIcon, QPalette, QLinearGradient, QBrush, QPainter, QGradient, QPixmap
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread, QRunnable, QThreadPool, QUrl
+from PyQt5.QtGui import QColor, QDesktopServices, QFont, QIcon, QPalette, QLinearGradient, QBrush, QPainter, QGradient, QPixmap
 
 # Add parent directory to path to import modules correctly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.generator import generate_batch
-from src.utils import get_video_files
+from src.utils import get_video_files, iter_video_names
+
+# Project folders, resolved once at import
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+ASSETS_DIR = PROJECT_DIR / "assets"
 
 # Modern, clean color palette  
 # Primary accent is a calm blue, with neutral light greys for backgrounds.  
@@ -36,61 +40,170 @@ COLORS = {
     'text': '#4E342E'
 }
 
-# Define styled button with green gradient
+# Shared stylesheets, formatted once and installed on the QApplication so Qt
+# parses each rule once instead of once per widget (see GLOBAL_QSS)
+BUTTON_QSS = f"""
+    QPushButton#styledBtn {{
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['darker_accent']}, stop:1 {COLORS['primary']});
+        color: {COLORS['darkest']};
+        border: none;
+        padding: 8px 18px;
+        border-radius: 6px;
+        font-weight: 600;
+    }}
+    QPushButton#styledBtn:hover {{
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['primary']}, stop:1 {COLORS['lighter']});
+    }}
+    QPushButton#styledBtn:pressed {{
+        background: {COLORS['darker_accent']};
+    }}
+"""
+
+GROUPBOX_QSS = f"""
+    QGroupBox#styledGroup {{
+        background-color: {COLORS['darkest']};
+        border: 1px solid {COLORS['darker']};
+        border-radius: 8px;
+        margin-top: 1.5em;
+        font-weight: 600;
+        color: {COLORS['primary']};
+    }}
+    QGroupBox#styledGroup::title {{
+        subcontrol-origin: margin;
+        subcontrol-position: top center;
+        padding: 0 6px;
+        color: {COLORS['primary']};
+    }}
+"""
+
+MESSAGE_BOX_QSS = f"""
+    QMessageBox#styledMsgBox {{
+        background-color: {COLORS['dark']};
+        color: {COLORS['text']};
+    }}
+    QMessageBox#styledMsgBox QPushButton {{
+        background-color: {COLORS['darker']};
+        color: {COLORS['text']};
+        border: 1px solid {COLORS['primary']};
+        border-radius: 4px;
+        padding: 5px 15px;
+        min-width: 80px;
+    }}
+    QMessageBox#styledMsgBox QPushButton:hover {{
+        background-color: {COLORS['primary']};
+        color: black;
+    }}
+"""
+
+PATH_FIELD_QSS = f"""
+    QLineEdit#pathField {{
+        background-color: {COLORS['darkest']};
+        color: {COLORS['text']};
+        border: 1px solid {COLORS['darker']};
+        border-radius: 4px;
+        padding: 6px;
+    }}
+"""
+
+GLOBAL_QSS = BUTTON_QSS + GROUPBOX_QSS + MESSAGE_BOX_QSS + PATH_FIELD_QSS
+
+# Inline stylesheets for individual widgets, formatted once here rather than
+# on every window construction
+HEADER_QSS = f"background-color: {COLORS['darkest']}; padding: 10px;"
+# Scoped to the central widget itself: a bare declaration on it would act as
+# a "*" rule for every child and override the app-level GLOBAL_QSS rules
+CENTRAL_QSS = f"QWidget#central {{ background-color: {COLORS['dark']}; }}"
+LABEL_QSS = f"color: {COLORS['text']}; padding: 5px;"
+TEXT_LABEL_QSS = f"color: {COLORS['text']};"
+SLIDER_QSS = "margin-left:10px; margin-right:10px;"
+
+SPINBOX_QSS = f"""
+    background-color: {COLORS['darkest']};
+    color: {COLORS['text']};
+    border: 1px solid {COLORS['darker']};
+    border-radius: 4px;
+    padding: 4px;
+"""
+
+# Shared by the video lists, the videos spinner and the combo boxes
+INPUT_QSS = f"""
+    background-color: {COLORS['darker']};
+    color: {COLORS['text']};
+    border: 1px solid {COLORS['darkest']};
+    border-radius: 4px;
+    padding: 5px;
+"""
+
+LINE_EDIT_QSS = f"""
+    background-color: {COLORS['darker']};
+    color: {COLORS['text']};
+    border: 1px solid {COLORS['darkest']};
+    border-radius: 4px;
+    padding: 4px;
+"""
+
+CHECKBOX_QSS = f"""
+    color: {COLORS['text']};
+    font-weight: bold;
+    padding: 5px;
+"""
+
+PROGRESS_BAR_QSS = f"""
+    QProgressBar {{
+        background-color: {COLORS['darker']};
+        color: {COLORS['text']};
+        border: 1px solid {COLORS['darkest']};
+        border-radius: 4px;
+        padding: 1px;
+        text-align: center;
+    }}
+    QProgressBar::chunk {{
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['darker_accent']}, stop:1 {COLORS['primary']});
+        border-radius: 3px;
+    }}
+"""
+
+FOOTER_QSS = f"""
+    color: {COLORS['text']};
+    padding: 10px;
+    background-color: {COLORS['darkest']};
+    border-top: 1px solid {COLORS['primary']};
+    font-style: italic;
+"""
+
+# Names shown per video list before the rest of a large folder is appended
+LIST_PREVIEW_SIZE = 500
+
+# Minimum seconds between progress updates sent to the GUI (about 30 per second)
+PROGRESS_INTERVAL = 0.033
+
+def _make_shadow(blur_radius, alpha, offset):
+    """Return a new drop shadow effect (Qt needs one instance per widget)."""
+    shadow = QGraphicsDropShadowEffect()
+    shadow.setBlurRadius(blur_radius)
+    shadow.setColor(QColor(0, 0, 0, alpha))
+    shadow.setOffset(0, offset)
+    return shadow
+
+# Define styled button with orange gradient (styled by BUTTON_QSS)
 class StyledButton(QPushButton):
-    def __init__(self, text, parent=None):
+    def __init__(self, text, parent=None, shadow=False):
         super().__init__(text, parent)
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['darker_accent']}, stop:1 {COLORS['primary']});
-                color: {COLORS['darkest']};
-                border: none;
-                padding: 8px 18px;
-                border-radius: 6px;
-                font-weight: 600;
-            }}
-            QPushButton:hover {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['primary']}, stop:1 {COLORS['lighter']});
-            }}
-            QPushButton:pressed {{
-                background: {COLORS['darker_accent']};
-            }}
-        """)
+        self.setObjectName("styledBtn")
         
-        # Add drop shadow for depth
-        shadow = QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(10)
-        shadow.setColor(QColor(0, 0, 0, 80))
-        shadow.setOffset(0, 2)
-        self.setGraphicsEffect(shadow)
+        # A drop shadow renders the button offscreen on every repaint, so
+        # only primary actions get one
+        if shadow:
+            self.setGraphicsEffect(_make_shadow(10, 80, 2))
 
-# Define styled group box with green header
+# Define styled group box with orange header (styled by GROUPBOX_QSS)
 class StyledGroupBox(QGroupBox):
     def __init__(self, title, parent=None):
         super().__init__(title, parent)
-        self.setStyleSheet(f"""
-            QGroupBox {{
-                background-color: {COLORS['darkest']};
-                border: 1px solid {COLORS['darker']};
-                border-radius: 8px;
-                margin-top: 1.5em;
-                font-weight: 600;
-                color: {COLORS['primary']};
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                subcontrol-position: top center;
-                padding: 0 6px;
-                color: {COLORS['primary']};
-            }}
-        """)
+        self.setObjectName("styledGroup")
         
         # Add drop shadow for depth
-        shadow = QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(15)
-        shadow.setColor(QColor(0, 0, 0, 100))
-        shadow.setOffset(0, 3)
-        self.setGraphicsEffect(shadow)
+        self.setGraphicsEffect(_make_shadow(15, 100, 3))
 
 class ProgressSignals(QObject):
     """Signals for updating progress and status from worker threads."""
@@ -98,19 +211,60 @@ class ProgressSignals(QObject):
     error = pyqtSignal(str)
     complete = pyqtSignal(int)  # Sends number of videos generated
 
+class ListRefreshSignals(QObject):
+    """Signals for handing directory listings back to the GUI thread."""
+    finished = pyqtSignal(int, list, list)  # Refresh number, input names, output names
+    more = pyqtSignal(int, list, list)  # Names past the first LIST_PREVIEW_SIZE of each folder
+
+class RefreshWorker(QRunnable):
+    """Lists the input and output folders off the GUI thread."""
+    def __init__(self, signals, number, input_path, output_path):
+        super().__init__()
+        self.signals = signals
+        self.number = number
+        self.input_path = input_path
+        self.output_path = output_path
+    
+    def run(self):
+        # The first names of each folder are sent straight away so the lists
+        # paint quickly; the rest of a large folder follows in one batch
+        input_names = iter_video_names(self.input_path)
+        output_names = iter_video_names(self.output_path)
+        self.signals.finished.emit(self.number,
+                                   list(islice(input_names, LIST_PREVIEW_SIZE)),
+                                   list(islice(output_names, LIST_PREVIEW_SIZE)))
+        
+        more_inputs = list(input_names)
+        more_outputs = list(output_names)
+        if more_inputs or more_outputs:
+            self.signals.more.emit(self.number, more_inputs, more_outputs)
+
 class ScrambleClipGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         
+        # App-wide rules for the styled widgets, parsed once for all of them
+        QApplication.instance().setStyleSheet(GLOBAL_QSS)
+        
         # Paths
-        self.input_video_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets", "input_videos"))
-        self.input_audio_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets", "input_audio", "audio.mp3"))
-        self.output_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "outputs"))
+        self.input_video_path = ASSETS_DIR / "input_videos"
+        self.input_audio_path = ASSETS_DIR / "input_audio" / "audio.mp3"
+        self.output_path = PROJECT_DIR / "outputs"
         
         # Create required directories
-        os.makedirs(self.input_video_path, exist_ok=True)
-        os.makedirs(os.path.dirname(self.input_audio_path), exist_ok=True)
-        os.makedirs(self.output_path, exist_ok=True)
+        self.input_video_path.mkdir(parents=True, exist_ok=True)
+        self.input_audio_path.parent.mkdir(parents=True, exist_ok=True)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        
+        # Folder listings arrive here from RefreshWorker; only the latest
+        # refresh is shown if several overlap
+        self.list_signals = ListRefreshSignals()
+        self.list_signals.finished.connect(self._populate_lists)
+        self.list_signals.more.connect(self._append_lists)
+        self.refresh_number = 0
+        
+        # Created on first use by browse_directory
+        self.directory_dialog = None
         
         # Initialize UI
         self.init_ui()
@@ -119,6 +273,22 @@ class ScrambleClipGUI(QMainWindow):
         self.refresh_video_lists()
         print("PyQt GUI initialized")
 
+    def _add_path_row(self, layout, row, title, initial, on_browse):
+        """Add a label, read-only path field and Browse button to a grid row.
+
+        Returns (field, button) so callers can keep references to them.
+        """
+        layout.addWidget(QLabel(title), row, 0)
+        field = QLineEdit(initial)
+        field.setReadOnly(True)
+        field.setObjectName("pathField")
+        layout.addWidget(field, row, 1)
+        
+        button = StyledButton("Browse")
+        button.clicked.connect(on_browse)
+        layout.addWidget(button, row, 2)
+        return field, button
+    
     def init_ui(self):
         self.setWindowTitle("Scramble Clip 2.5")
         # Increase minimum and initial window size for better usability
@@ -126,9 +296,9 @@ class ScrambleClipGUI(QMainWindow):
         self.resize(1200, 900)
         
         # Set the window icon
-        icon_path = os.path.join(os.path.dirname(__file__), "..", "assets", "icon.png")
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
+        icon_path = ASSETS_DIR / "icon.png"
+        if icon_path.exists():
+            self.setWindowIcon(QIcon(str(icon_path)))
         
         # Center the window
         self.center()
@@ -137,9 +307,8 @@ class ScrambleClipGUI(QMainWindow):
         main_layout = QVBoxLayout()
         
         # Create header with updated logo image
-        logo_path = os.path.join(os.path.dirname(__file__), "..", "assets", "scramble clip logo 4.png")
         header = QLabel()
-        pixmap = QPixmap(logo_path)
+        pixmap = QPixmap(str(ASSETS_DIR / "scramble clip logo 4.png"))
         # Scale banner to 5% of original size for a 95% reduction (half the previous size)
         if not pixmap.isNull():
             new_width = int(pixmap.width() * 0.05)
@@ -149,11 +318,12 @@ class ScrambleClipGUI(QMainWindow):
         else:
             header.setText("Scramble Clip 2.5")
         header.setAlignment(Qt.AlignCenter)
-        header.setStyleSheet(f"background-color: {COLORS['darkest']}; padding: 10px;")
+        header.setStyleSheet(HEADER_QSS)
         
         # Create central widget with dark background
         central_widget = QWidget()
-        central_widget.setStyleSheet(f"background-color: {COLORS['dark']};")
+        central_widget.setObjectName("central")
+        central_widget.setStyleSheet(CENTRAL_QSS)
         
         # Main container for all controls
         container = QVBoxLayout()
@@ -165,74 +335,22 @@ class ScrambleClipGUI(QMainWindow):
         path_layout = QGridLayout()
         path_layout.setColumnStretch(1, 1)  # Make the path display stretch
         
-        # Input videos path row
-        path_layout.addWidget(QLabel("Input Videos:"), 0, 0)
-        self.input_video_path_label = QLineEdit(self.input_video_path)
-        self.input_video_path_label.setReadOnly(True)
-        self.input_video_path_label.setStyleSheet(f"""
-            background-color: {COLORS['darkest']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darker']};
-            border-radius: 4px;
-            padding: 6px;
-        """)
-        path_layout.addWidget(self.input_video_path_label, 0, 1)
-        
-        browse_input_btn = StyledButton("Browse")
-        browse_input_btn.clicked.connect(lambda: self.browse_directory("input_video"))
-        path_layout.addWidget(browse_input_btn, 0, 2)
-        
-        # Input audio path row
-        path_layout.addWidget(QLabel("Input Audio:"), 1, 0)
-        self.input_audio_path_label = QLineEdit(self.input_audio_path)
-        self.input_audio_path_label.setReadOnly(True)
-        self.input_audio_path_label.setStyleSheet(f"""
-            background-color: {COLORS['darkest']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darker']};
-            border-radius: 4px;
-            padding: 6px;
-        """)
-        path_layout.addWidget(self.input_audio_path_label, 1, 1)
-        
-        browse_audio_btn = StyledButton("Browse")
-        browse_audio_btn.clicked.connect(lambda: self.browse_file("input_audio"))
-        path_layout.addWidget(browse_audio_btn, 1, 2)
-        
-        # Output path row
-        path_layout.addWidget(QLabel("Output Path:"), 2, 0)
-        self.output_path_label = QLineEdit(self.output_path)
-        self.output_path_label.setReadOnly(True)
-        self.output_path_label.setStyleSheet(f"""
-            background-color: {COLORS['darkest']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darker']};
-            border-radius: 4px;
-            padding: 6px;
-        """)
-        path_layout.addWidget(self.output_path_label, 2, 1)
-        
-        browse_output_btn = StyledButton("Browse")
-        browse_output_btn.clicked.connect(lambda: self.browse_directory("output"))
-        path_layout.addWidget(browse_output_btn, 2, 2)
+        self.input_video_path_label, _ = self._add_path_row(
+            path_layout, 0, "Input Videos:", str(self.input_video_path),
+            lambda: self.browse_directory("input_video"))
+        self.input_audio_path_label, _ = self._add_path_row(
+            path_layout, 1, "Input Audio:", str(self.input_audio_path),
+            lambda: self.browse_file("input_audio"))
+        self.output_path_label, _ = self._add_path_row(
+            path_layout, 2, "Output Path:", str(self.output_path),
+            lambda: self.browse_directory("output"))
         
         # Overlay video path row (row 3)
         self.overlay_video_path = ""  # default empty
-        path_layout.addWidget(QLabel("Overlay Video:"), 3, 0)
-        self.overlay_video_path_label = QLineEdit(self.overlay_video_path)
-        self.overlay_video_path_label.setReadOnly(True)
-        self.overlay_video_path_label.setStyleSheet(f"""
-             background-color: {COLORS['darkest']};
-             color: {COLORS['text']};
-             border: 1px solid {COLORS['darker']};
-             border-radius: 4px;
-             padding: 6px;
-         """)
-        path_layout.addWidget(self.overlay_video_path_label, 3, 1)
-        self.browse_overlay_btn = StyledButton("Browse")
-        self.browse_overlay_btn.clicked.connect(lambda: self.browse_file("overlay_video"))
+        self.overlay_video_path_label, self.browse_overlay_btn = self._add_path_row(
+            path_layout, 3, "Overlay Video:", self.overlay_video_path,
+            lambda: self.browse_file("overlay_video"))
         self.browse_overlay_btn.setEnabled(False)
-        path_layout.addWidget(self.browse_overlay_btn, 3, 2)
         
         # disable overlay path label initially
         self.overlay_video_path_label.setEnabled(False)
@@ -255,13 +373,7 @@ class ScrambleClipGUI(QMainWindow):
         self.duration_spinner.setRange(5, 120)
         self.duration_spinner.setValue(16)
         self.duration_spinner.setSingleStep(1)
-        self.duration_spinner.setStyleSheet(f"""
-            background-color: {COLORS['darkest']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darker']};
-            border-radius: 4px;
-            padding: 4px;
-        """)
+        self.duration_spinner.setStyleSheet(SPINBOX_QSS)
         out_layout.addWidget(self.duration_spinner, 0, 1)
 
         output_opts_group.setLayout(out_layout)
@@ -279,13 +391,7 @@ class ScrambleClipGUI(QMainWindow):
         input_layout = QVBoxLayout(input_content)
         
         self.input_video_list = QListWidget()
-        self.input_video_list.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.input_video_list.setStyleSheet(INPUT_QSS)
         input_layout.addWidget(self.input_video_list)
         
         input_buttons = QHBoxLayout()
@@ -321,13 +427,7 @@ class ScrambleClipGUI(QMainWindow):
         output_layout = QVBoxLayout(output_content)
         
         self.output_video_list = QListWidget()
-        self.output_video_list.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.output_video_list.setStyleSheet(INPUT_QSS)
         output_layout.addWidget(self.output_video_list)
         
         output_buttons = QHBoxLayout()
@@ -367,25 +467,13 @@ class ScrambleClipGUI(QMainWindow):
         self.num_videos_spinner.setMinimum(1)
         self.num_videos_spinner.setMaximum(100)
         self.num_videos_spinner.setValue(5)
-        self.num_videos_spinner.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.num_videos_spinner.setStyleSheet(INPUT_QSS)
         controls_layout.addWidget(self.num_videos_spinner)
         
         # Base name for output files
         controls_layout.addWidget(QLabel("Base name:"))
         self.basename_input = QLineEdit("output")
-        self.basename_input.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 4px;
-        """)
+        self.basename_input.setStyleSheet(LINE_EDIT_QSS)
         controls_layout.addWidget(self.basename_input)
         
         # Add checkboxes to layout
@@ -394,11 +482,7 @@ class ScrambleClipGUI(QMainWindow):
         # Add AI toggle checkbox
         self.use_ai_checkbox = QCheckBox("Use AI for smart clip selection")
         self.use_ai_checkbox.setChecked(True)
-        self.use_ai_checkbox.setStyleSheet(f"""
-            color: {COLORS['text']};
-            font-weight: bold;
-            padding: 5px;
-        """)
+        self.use_ai_checkbox.setStyleSheet(CHECKBOX_QSS)
         self.use_ai_checkbox.setToolTip(
             "When enabled, AI analyzes video content to:\n"
             "• Select the most interesting video segments\n"
@@ -412,11 +496,7 @@ class ScrambleClipGUI(QMainWindow):
         # Add AI Effects checkbox
         self.use_effects_checkbox = QCheckBox("Add AI-powered effects & transitions")
         self.use_effects_checkbox.setChecked(False)
-        self.use_effects_checkbox.setStyleSheet(f"""
-            color: {COLORS['text']};
-            font-weight: bold;
-            padding: 5px;
-        """)
+        self.use_effects_checkbox.setStyleSheet(CHECKBOX_QSS)
         self.use_effects_checkbox.setToolTip(
             "When enabled, AI will enhance videos with:\n"
             "• Smart transitions between clips\n"
@@ -430,7 +510,7 @@ class ScrambleClipGUI(QMainWindow):
         # Effects style dropdown (Classic / Graincore)
         effects_style_layout = QHBoxLayout()
         self.effects_style_label = QLabel("Effects style:")
-        self.effects_style_label.setStyleSheet(f"color: {COLORS['text']}; padding: 5px;")
+        self.effects_style_label.setStyleSheet(LABEL_QSS)
         self.effects_style_combo = QComboBox()
         self.effects_style_combo.addItems(["Classic", "Graincore"])
         # Initially hidden
@@ -451,11 +531,7 @@ class ScrambleClipGUI(QMainWindow):
         # Add Text Overlay checkbox
         self.use_text_checkbox = QCheckBox("Add text to videos")
         self.use_text_checkbox.setChecked(False)
-        self.use_text_checkbox.setStyleSheet(f"""
-            color: {COLORS['text']};
-            font-weight: bold;
-            padding: 5px;
-        """)
+        self.use_text_checkbox.setStyleSheet(CHECKBOX_QSS)
         checks_layout.addWidget(self.use_text_checkbox)
         
         # Connect checkbox state change to show/hide text input
@@ -475,7 +551,7 @@ class ScrambleClipGUI(QMainWindow):
         # Speed factor dropdown
         speed_layout = QHBoxLayout()
         speed_label = QLabel("Speed:")
-        speed_label.setStyleSheet(f"color: {COLORS['text']}; padding: 5px;")
+        speed_label.setStyleSheet(LABEL_QSS)
         self.speed_combo = QComboBox()
         # Extended speed options including up to 2.75x
         self.speed_combo.addItems([
@@ -488,13 +564,7 @@ class ScrambleClipGUI(QMainWindow):
             "2.5x",
             "2.75x"
         ])
-        self.speed_combo.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.speed_combo.setStyleSheet(INPUT_QSS)
         speed_layout.addWidget(speed_label)
         speed_layout.addWidget(self.speed_combo)
         checks_layout.addLayout(speed_layout)
@@ -502,13 +572,13 @@ class ScrambleClipGUI(QMainWindow):
         # Intensity slider (0-100)
         intensity_layout = QHBoxLayout()
         self.intensity_label = QLabel("Intensity: 50")
-        self.intensity_label.setStyleSheet(f"color: {COLORS['text']}; padding: 5px;")
+        self.intensity_label.setStyleSheet(LABEL_QSS)
         self.intensity_slider = QSlider(Qt.Horizontal)
         self.intensity_slider.setRange(0, 100)
         self.intensity_slider.setValue(50)
         self.intensity_slider.setTickPosition(QSlider.TicksBelow)
         self.intensity_slider.setTickInterval(10)
-        self.intensity_slider.setStyleSheet(f"margin-left:10px; margin-right:10px;")
+        self.intensity_slider.setStyleSheet(SLIDER_QSS)
         self.intensity_slider.valueChanged.connect(lambda v: self.intensity_label.setText(f"Intensity: {v}"))
         # hide initially
         self.intensity_label.setVisible(False)
@@ -524,18 +594,12 @@ class ScrambleClipGUI(QMainWindow):
         # Add text input field for custom text and formatting controls
         self.text_input_layout = QHBoxLayout()
         self.text_input_label = QLabel("Custom text:")
-        self.text_input_label.setStyleSheet(f"color: {COLORS['text']};")
+        self.text_input_label.setStyleSheet(TEXT_LABEL_QSS)
         self.text_input = QLineEdit()
         # Font selection dropdown
         self.font_combo = QFontComboBox()
         self.font_combo.setCurrentFont(QFont("Arial"))
-        self.font_combo.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.font_combo.setStyleSheet(INPUT_QSS)
         # Style toggles
         self.bold_checkbox = QCheckBox("Bold")
         self.italic_checkbox = QCheckBox("Italic")
@@ -544,16 +608,10 @@ class ScrambleClipGUI(QMainWindow):
         self.position_combo = QComboBox()
         self.position_combo.addItems(["Top", "Center", "Bottom"])
         self.position_combo.setCurrentIndex(0)  # Default Top
-        self.position_combo.setStyleSheet(f"""
-            background-color: {COLORS['darker']};
-            color: {COLORS['text']};
-            border: 1px solid {COLORS['darkest']};
-            border-radius: 4px;
-            padding: 5px;
-        """)
+        self.position_combo.setStyleSheet(INPUT_QSS)
         # Style toggles styling and visibility
         for cb in (self.bold_checkbox, self.italic_checkbox, self.underline_checkbox):
-            cb.setStyleSheet(f"color: {COLORS['text']}; padding: 5px;")
+            cb.setStyleSheet(LABEL_QSS)
             cb.setVisible(False)
         self.position_combo.setVisible(False)
         # Initially hide text and controls
@@ -586,7 +644,7 @@ class ScrambleClipGUI(QMainWindow):
         refresh_btn.clicked.connect(self.refresh_video_lists)
         buttons_layout.addWidget(refresh_btn)
         
-        generate_btn = StyledButton("Generate Videos")
+        generate_btn = StyledButton("Generate Videos", shadow=True)
         generate_btn.clicked.connect(self.generate_videos)
         generate_btn.setMinimumWidth(150)
         buttons_layout.addWidget(generate_btn)
@@ -613,27 +671,11 @@ class ScrambleClipGUI(QMainWindow):
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
-        self.progress_bar.setStyleSheet(f"""
-            QProgressBar {{
-                background-color: {COLORS['darker']};
-                color: {COLORS['text']};
-                border: 1px solid {COLORS['darkest']};
-                border-radius: 4px;
-                padding: 1px;
-                text-align: center;
-            }}
-            QProgressBar::chunk {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 {COLORS['darker_accent']}, stop:1 {COLORS['primary']});
-                border-radius: 3px;
-            }}
-        """)
+        self.progress_bar.setStyleSheet(PROGRESS_BAR_QSS)
         progress_layout.addWidget(self.progress_bar)
         
         self.status_label = QLabel("Ready")
-        self.status_label.setStyleSheet(f"""
-            color: {COLORS['text']};
-            padding: 5px;
-        """)
+        self.status_label.setStyleSheet(LABEL_QSS)
         progress_layout.addWidget(self.status_label)
         
         gen_layout.addLayout(progress_layout)
@@ -642,13 +684,7 @@ class ScrambleClipGUI(QMainWindow):
         
         # Add footer
         footer = QLabel("A tool by ClipmodeGo")
-        footer.setStyleSheet(f"""
-            color: {COLORS['text']};
-            padding: 10px;
-            background-color: {COLORS['darkest']};
-            border-top: 1px solid {COLORS['primary']};
-            font-style: italic;
-        """)
+        footer.setStyleSheet(FOOTER_QSS)
         footer.setAlignment(Qt.AlignCenter)
         
         # Set layouts
@@ -673,31 +709,49 @@ class ScrambleClipGUI(QMainWindow):
         """Update progress bar and status label."""
         self.progress_bar.setValue(progress)
         self.status_label.setText(status)
-        QApplication.processEvents()  # Ensure UI updates
     
     def refresh_video_lists(self):
-        """Refresh the input and output video lists."""
-        print("Refreshing video lists...")
-        # Clear lists
-        self.input_video_list.clear()
-        self.output_video_list.clear()
+        """Refresh the input and output video lists.
         
+        The folders are listed on a QThreadPool thread so a slow (e.g. network)
+        drive doesn't freeze the window; _populate_lists fills in the result.
+        """
+        print("Refreshing video lists...")
         # Update paths from text fields
-        self.input_video_path = self.input_video_path_label.text()
-        self.input_audio_path = self.input_audio_path_label.text()
-        self.output_path = self.output_path_label.text()
+        self.input_video_path = Path(self.input_video_path_label.text())
+        self.input_audio_path = Path(self.input_audio_path_label.text())
+        self.output_path = Path(self.output_path_label.text())
         
-        # Fill input videos list
-        if os.path.exists(self.input_video_path):
-            input_videos = get_video_files(self.input_video_path)
-            for video in input_videos:
-                self.input_video_list.addItem(os.path.basename(video))
-        
-        # Fill output videos list
-        if os.path.exists(self.output_path):
-            output_videos = get_video_files(self.output_path)
-            for video in output_videos:
-                self.output_video_list.addItem(os.path.basename(video))
+        self.refresh_number += 1
+        QThreadPool.globalInstance().start(
+            RefreshWorker(self.list_signals, self.refresh_number, self.input_video_path, self.output_path))
+    
+    def _populate_lists(self, number, input_names, output_names):
+        """Show the folder listings of refresh `number` (called on the GUI thread)."""
+        if number != self.refresh_number:
+            return  # A newer refresh is still running
+        
+        # Fill the video lists (a missing folder just lists nothing)
+        self._fill_lists(input_names, output_names, clear=True)
+    
+    def _append_lists(self, number, input_names, output_names):
+        """Add the names past the first LIST_PREVIEW_SIZE of refresh `number`."""
+        if number != self.refresh_number:
+            return
+        self._fill_lists(input_names, output_names, clear=False)
+    
+    def _fill_lists(self, input_names, output_names, clear):
+        """Add names to the video lists, holding back repaints and item
+        signals until each list is complete, then update the status."""
+        for list_widget, names in ((self.input_video_list, input_names),
+                                   (self.output_video_list, output_names)):
+            list_widget.setUpdatesEnabled(False)
+            list_widget.blockSignals(True)
+            if clear:
+                list_widget.clear()
+            list_widget.addItems(names)
+            list_widget.blockSignals(False)
+            list_widget.setUpdatesEnabled(True)
                 
         # Update status
         input_count = self.input_video_list.count()
@@ -715,17 +769,13 @@ class ScrambleClipGUI(QMainWindow):
         
         # Determine if it's an input or output video
         if list_widget == self.input_video_list:
-            video_path = os.path.join(self.input_video_path, selected_name)
+            video_path = self.input_video_path / selected_name
         else:
-            video_path = os.path.join(self.output_path, selected_name)
+            video_path = self.output_path / selected_name
             
         # Open video with system default player
-        if platform.system() == 'Darwin':  # macOS
-            subprocess.call(('open', video_path))
-        elif platform.system() == 'Windows':  # Windows
-            os.startfile(video_path)
-        else:  # Linux
-            subprocess.call(('xdg-open', video_path))
+        if not QDesktopServices.openUrl(QUrl.fromLocalFile(str(video_path))):
+            QMessageBox.warning(self, "Error", f"Could not open video: {video_path}")
     
     def delete_selected_output(self):
         """Delete the selected output video."""
@@ -735,7 +785,7 @@ class ScrambleClipGUI(QMainWindow):
             return
             
         selected_name = selected_items[0].text()
-        video_path = os.path.join(self.output_path, selected_name)
+        video_path = self.output_path / selected_name
         
         # Create a custom styled message box
         msg_box = QMessageBox(self)
@@ -743,50 +793,44 @@ class ScrambleClipGUI(QMainWindow):
         msg_box.setText(f"Are you sure you want to delete {selected_name}?")
         msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         msg_box.setDefaultButton(QMessageBox.No)
-        msg_box.setStyleSheet(f"""
-            QMessageBox {{
-                background-color: {COLORS['dark_bg']};
-                color: {COLORS['text_primary']};
-            }}
-            QPushButton {{
-                background-color: {COLORS['dark_panel']};
-                color: {COLORS['text_primary']};
-                border: 1px solid {COLORS['green_accent']};
-                border-radius: 4px;
-                padding: 5px 15px;
-                min-width: 80px;
-            }}
-            QPushButton:hover {{
-                background-color: {COLORS['green_accent']};
-                color: black;
-            }}
-        """)
+        msg_box.setObjectName("styledMsgBox")
         
         reply = msg_box.exec_()
         
         if reply == QMessageBox.Yes:
             try:
-                os.remove(video_path)
+                video_path.unlink()
                 self.status_label.setText(f"Deleted {selected_name}")
                 self.refresh_video_lists()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete file: {str(e)}")
     
     def browse_directory(self, dir_type):
-        """Browse for a directory."""
-        directory = QFileDialog.getExistingDirectory(
-            self,
-            f"Select {dir_type.title()} Directory",
-            "",
-            QFileDialog.ShowDirsOnly
-        )
+        """Browse for a directory, starting from the current one of that type."""
+        # One dialog is kept and reused, so Qt doesn't build a new file
+        # system model (and re-read the folders) on every browse
+        if self.directory_dialog is None:
+            self.directory_dialog = QFileDialog(self)
+            self.directory_dialog.setFileMode(QFileDialog.Directory)
+            self.directory_dialog.setOption(QFileDialog.ShowDirsOnly, True)
+        dialog = self.directory_dialog
+        dialog.setWindowTitle(f"Select {dir_type.title()} Directory")
+        
+        # The dialog remembers the last folder shown, so always start it from
+        # the current folder of the type being browsed
+        start_dirs = {
+            "input_video": self.input_video_path,
+            "output": self.output_path,
+        }
+        dialog.setDirectory(str(start_dirs[dir_type]))
         
+        directory = dialog.selectedFiles()[0] if dialog.exec_() else ""
         if directory:
             if dir_type == "input_video":
-                self.input_video_path = directory
+                self.input_video_path = Path(directory)
                 self.input_video_path_label.setText(directory)
             elif dir_type == "output":
-                self.output_path = directory
+                self.output_path = Path(directory)
                 self.output_path_label.setText(directory)
             
             self.refresh_video_lists()
@@ -806,7 +850,7 @@ class ScrambleClipGUI(QMainWindow):
         
         if file_path:
             if file_type == "input_audio":
-                self.input_audio_path = file_path
+                self.input_audio_path = Path(file_path)
                 self.input_audio_path_label.setText(file_path)
             elif file_type == "overlay_video":
                 self.overlay_video_path = file_path
@@ -830,13 +874,13 @@ class ScrambleClipGUI(QMainWindow):
         # Validate output path - make sure it exists and we can write to it
         try:
             # Create output directory if it doesn't exist
-            os.makedirs(self.output_path, exist_ok=True)
+            self.output_path.mkdir(parents=True, exist_ok=True)
             
             # Test if we can write to the output directory
-            test_file = os.path.join(self.output_path, ".write_test")
+            test_file = self.output_path / ".write_test"
             with open(test_file, 'w') as f:
                 f.write("test")
-            os.remove(test_file)
+            test_file.unlink()
         except Exception as e:
             # If there's an issue with the output path, show a warning and suggest a simpler path
             simple_path = os.path.expanduser("~/Desktop/scramble_output")
@@ -845,8 +889,8 @@ class ScrambleClipGUI(QMainWindow):
                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
             
             if reply == QMessageBox.Yes:
-                self.output_path = simple_path
-                os.makedirs(self.output_path, exist_ok=True)
+                self.output_path = Path(simple_path)
+                self.output_path.mkdir(parents=True, exist_ok=True)
                 self.output_path_label.setText(f"Output Path: {self.output_path}")
             else:
                 return
@@ -890,9 +934,9 @@ class ScrambleClipGUI(QMainWindow):
             self.generate_thread = QThread()
             self.generate_worker = GenerateWorker(
                 num_videos=num_videos,
-                input_video_path=self.input_video_path,
-                input_audio_path=self.input_audio_path,
-                output_path=self.output_path,
+                input_video_path=str(self.input_video_path),
+                input_audio_path=str(self.input_audio_path),
+                output_path=str(self.output_path),
                 base_name=self.basename_input.text(),
                 target_duration=self.duration_spinner.value(),
                 overlay_video_path=self.overlay_video_path if self.use_overlay_checkbox.isChecked() else None,
@@ -918,8 +962,11 @@ class ScrambleClipGUI(QMainWindow):
             self.generate_worker.progress.connect(self.update_progress)
             self.generate_worker.finished.connect(self.generation_finished)
             self.generate_worker.error.connect(self.show_error)
-            self.generate_worker.finished.connect(self.generate_thread.quit)
-            self.generate_worker.finished.connect(self.generate_worker.deleteLater)
+            # Stop the thread's event loop however the run ends, so a failed
+            # generation doesn't leave an idle thread behind
+            for done in (self.generate_worker.finished, self.generate_worker.error):
+                done.connect(self.generate_thread.quit)
+                done.connect(self.generate_worker.deleteLater)
             self.generate_thread.finished.connect(self.generate_thread.deleteLater)
             
             # Start thread
@@ -945,24 +992,7 @@ class ScrambleClipGUI(QMainWindow):
         msg_box.setWindowTitle("Error")
         msg_box.setText(message)
         msg_box.setIcon(QMessageBox.Critical)
-        msg_box.setStyleSheet(f"""
-            QMessageBox {{
-                background-color: {COLORS['dark']};
-                color: {COLORS['text']};
-            }}
-            QPushButton {{
-                background-color: {COLORS['darker']};
-                color: {COLORS['text']};
-                border: 1px solid {COLORS['primary']};
-                border-radius: 4px;
-                padding: 5px 15px;
-                min-width: 80px;
-            }}
-            QPushButton:hover {{
-                background-color: {COLORS['primary']};
-                color: black;
-            }}
-        """)
+        msg_box.setObjectName("styledMsgBox")
         msg_box.exec_()
     
     def generation_finished(self):
@@ -1000,7 +1030,7 @@ class ScrambleClipGUI(QMainWindow):
                 # Copy file to input directory
                 try:
                     filename = os.path.basename(file_path)
-                    dest_path = os.path.join(self.input_video_path, filename)
+                    dest_path = self.input_video_path / filename
                     shutil.copy2(file_path, dest_path)
                 except Exception as e:
                     QMessageBox.warning(self, "Warning", f"Error copying file: {str(e)}")
@@ -1019,9 +1049,9 @@ class ScrambleClipGUI(QMainWindow):
         
         # Determine if it's an input or output video
         if list_widget == self.input_video_list:
-            video_path = os.path.join(self.input_video_path, selected_name)
+            video_path = self.input_video_path / selected_name
         else:
-            video_path = os.path.join(self.output_path, selected_name)
+            video_path = self.output_path / selected_name
             
         # Confirm deletion
         reply = QMessageBox.question(
@@ -1034,22 +1064,15 @@ class ScrambleClipGUI(QMainWindow):
         
         if reply == QMessageBox.Yes:
             try:
-                os.remove(video_path)
+                video_path.unlink()
                 self.refresh_video_lists()
             except Exception as e:
                 QMessageBox.warning(self, "Warning", f"Error deleting file: {str(e)}")
     
     def open_output_folder(self):
         """Open the output folder in the file explorer."""
-        try:
-            if platform.system() == 'Darwin':  # macOS
-                subprocess.call(('open', self.output_path))
-            elif platform.system() == 'Windows':  # Windows
-                os.startfile(self.output_path)
-            else:  # Linux
-                subprocess.call(('xdg-open', self.output_path))
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not open folder: {str(e)}")
+        if not QDesktopServices.openUrl(QUrl.fromLocalFile(str(self.output_path))):
+            QMessageBox.warning(self, "Error", f"Could not open folder: {self.output_path}")
     
     def center(self):
         """Center the window on the screen."""
@@ -1117,9 +1140,22 @@ class ScrambleClipGUI(QMainWindow):
             "Effects are chosen based on clip content and energy."
         )
 
+    def closeEvent(self, event):
+        """Stop a running generation before the window (and its QThread) goes away."""
+        if self.generation_running():
+            self.cancel_generation()
+        super().closeEvent(event)
+    
+    def generation_running(self):
+        """Return True while a generation thread is running."""
+        try:
+            return hasattr(self, 'generate_thread') and self.generate_thread.isRunning()
+        except RuntimeError:
+            return False  # Its C++ object was already deleted after finishing
+    
     def cancel_generation(self):
         """Cancel the ongoing video generation."""
-        if hasattr(self, 'generate_thread') and self.generate_thread.isRunning():
+        if self.generation_running():
             # Terminate the thread (force stop)
             self.generate_thread.terminate()
             self.generate_thread.wait()
@@ -1173,9 +1209,9 @@ class ScrambleClipGUI(QMainWindow):
 
     def apply_state(self, state):
         """Apply state dict to UI."""
-        self.input_video_path_label.setText(state.get("input_video_path", self.input_video_path))
-        self.input_audio_path_label.setText(state.get("input_audio_path", self.input_audio_path))
-        self.output_path_label.setText(state.get("output_path", self.output_path))
+        self.input_video_path_label.setText(state.get("input_video_path", str(self.input_video_path)))
+        self.input_audio_path_label.setText(state.get("input_audio_path", str(self.input_audio_path)))
+        self.output_path_label.setText(state.get("output_path", str(self.output_path)))
 
         self.num_videos_spinner.setValue(state.get("num_videos", 5))
         self.use_ai_checkbox.setChecked(state.get("use_ai", True))
@@ -1313,9 +1349,22 @@ class GenerateWorker(QObject):
                 self.error.emit(f"No video files found in: {self.input_video_path}")
                 return
                 
-            # Define progress callback
+            # Define progress callback. Routine updates are passed on to the
+            # GUI at most every PROGRESS_INTERVAL seconds, so a burst of
+            # callbacks doesn't flood its event queue with repaints. Errors,
+            # warnings and the final update always go through, and the latest
+            # skipped update is kept so it can be shown later
+            last_emit = [0.0]
+            pending = [None]
             def progress_callback(progress, status):
-                self.progress.emit(progress, status)
+                now = time.monotonic()
+                if (progress >= 100 or status.startswith(("Error", "Warning"))
+                        or now - last_emit[0] >= PROGRESS_INTERVAL):
+                    last_emit[0] = now
+                    pending[0] = None
+                    self.progress.emit(progress, status)
+                else:
+                    pending[0] = (progress, status)
                 print(f"Progress: {progress}%, Status: {status}")
             
             # Call generate_batch with the updated signature
@@ -1344,6 +1393,8 @@ class GenerateWorker(QObject):
                 target_duration=self.target_duration,
                 progress_callback=progress_callback
             )
+            if pending[0] is not None:
+                self.progress.emit(*pending[0])
             
             # Print paths again for verification
             print(f"Generation completed. Files should be in: {self.output_path}")
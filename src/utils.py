@@ -1,11 +1,31 @@
-import glob
+import os
 import random
-from moviepy.editor import VideoFileClip
-from moviepy.video.fx.fadeout import fadeout
-from moviepy.video.fx.speedx import speedx
+
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+
+def iter_video_names(input_folder):
+    """
+    Yield the names of the video files in input_folder (nothing if it doesn't exist).
+    
+    One lazy os.scandir pass, so callers can stop early; hidden files are
+    skipped like glob's "*" does.
+    """
+    try:
+        entries = os.scandir(input_folder)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with entries:
+        for entry in entries:
+            if (entry.name.endswith(VIDEO_EXTENSIONS) and not entry.name.startswith(".")
+                    and entry.is_file()):
+                yield entry.name
+
+def list_video_names(input_folder):
+    """Return the names of the video files in input_folder, or [] if it doesn't exist."""
+    return list(iter_video_names(input_folder))
 
 def get_video_files(input_folder):
-    return glob.glob(f"{input_folder}/*.mp4") + glob.glob(f"{input_folder}/*.mov")
+    return [os.path.join(input_folder, name) for name in list_video_names(input_folder)]
 
 def get_random_clip(video_path, duration=4, used_segments=None):
     """
@@ -19,6 +39,8 @@ def get_random_clip(video_path, duration=4, used_segments=None):
     Returns:
         A VideoFileClip object with the random segment
     """
+    from moviepy.editor import VideoFileClip
+    
     clip = VideoFileClip(video_path)
     
     # If video is shorter than requested duration, return the whole clip
@@ -119,6 +141,9 @@ def prepare_clip_for_concat(clip, add_transitions=True):
     Returns:
         Processed clip ready for concatenation
     """
+    from moviepy.video.fx.fadeout import fadeout
+    from moviepy.video.fx.speedx import speedx
+    
     # Don't modify very short clips (less than 1.5 seconds)
     if clip.duration < 1.5:
         return clip
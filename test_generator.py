@@ -1,5 +1,8 @@
 import os
-from src.generator import generate_batch
+import random
+import numpy as np
+from src.generator import (generate_batch, find_available_segments, similarity_matrix,
+                           calculate_similarity, _dhash, _fit_filter, _effects_graph)
 import glob
 import shutil
 
@@ -85,5 +88,94 @@ def run_test_generation():
     except Exception as e:
         print(f"Error generating test video: {e}")
 
+def _find_available_segments_loop(desired_duration, clip_duration, used, min_segment_size=0.5, buffer=0.1):
+    """The original sort-and-merge loop, kept as the reference for find_available_segments."""
+    if not used:
+        return [(0, clip_duration - desired_duration)]
+    merged = []
+    for start, end in sorted(used, key=lambda x: x[0]):
+        segment = (max(0, start - buffer), min(clip_duration, end + buffer))
+        if not merged or segment[0] > merged[-1][1]:
+            merged.append(segment)
+        else:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], segment[1]))
+    available = []
+    if merged[0][0] > desired_duration:
+        available.append((0, merged[0][0]))
+    for i in range(len(merged) - 1):
+        gap_start, gap_end = merged[i][1], merged[i+1][0]
+        if gap_end - gap_start >= desired_duration + min_segment_size:
+            available.append((gap_start, gap_end - desired_duration))
+    if clip_duration - merged[-1][1] >= desired_duration + min_segment_size:
+        available.append((merged[-1][1], clip_duration - desired_duration))
+    return available
+
+def test_find_available_segments_matches_loop():
+    rng = random.Random(1)
+    for _ in range(500):
+        clip_duration = rng.uniform(2, 60)
+        desired = rng.uniform(0.5, 4)
+        used = []
+        for _ in range(rng.randrange(8)):
+            start = rng.uniform(0, clip_duration)
+            used.append((start, min(clip_duration, start + rng.uniform(0.2, 5))))
+        split = rng.randrange(len(used) + 1)
+        got = find_available_segments(0, desired, clip_duration,
+                                      global_history=used[:split], local_history=used[split:])
+        expected = _find_available_segments_loop(desired, clip_duration, used)
+        assert np.allclose(np.reshape(got, (-1, 2)), np.reshape(expected, (-1, 2))), (used, got, expected)
+
+def test_find_available_segments_unused_clip():
+    assert find_available_segments(0, 2.0, 10.0) == [(0, 8.0)]
+
+def test_fit_filter():
+    # Vertical sources are cropped to fill, everything else is padded
+    assert _fit_filter(720, 1280, (1080, 1920)) == \
+        "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920"
+    assert _fit_filter(1920, 1080, (1080, 1920)) == \
+        "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black"
+
+def test_effects_graph_plain():
+    segments = [("a.mp4", 0.0, 2.0), ("b.mp4", 1.0, 4.0)]
+    graph = _effects_graph(segments, [None, None], False, "classic", 0.5, 1.0, 5.0)
+    assert graph["segments"] == segments
+    assert graph["segment_filters"] is None and graph["crossfades"] is None
+    assert graph["post_filter"] == "format=yuv420p"
+    assert graph["duration"] == 5.0
+
+def test_effects_graph_fx_and_speed():
+    segments = [("a.mp4", 0.0, 2.0), ("b.mp4", 1.0, 4.0)]
+    graph = _effects_graph(segments, [None, ("crossfadein", 0.3)], True, "classic", 0.5, 2.0, 5.0)
+    # 4.7s after the overlapping join, played at 2x, is repeated 3 times to fill 5s
+    assert len(graph["segments"]) == 6
+    assert graph["crossfades"] == [False, True] * 3
+    assert "fade=t=in" in graph["segment_filters"][0]
+    assert "fade=t=out" in graph["segment_filters"][1]
+    assert graph["post_filter"].startswith("setpts=PTS/2.0,fps=30,trim=duration=5.000")
+    assert graph["post_filter"].endswith("format=yuv420p")
+    assert graph["duration"] == 5.0
+
+def test_dhash():
+    # Brightness rising to the right sets every bit, falling clears them all
+    ramp = np.tile(np.linspace(0, 255, 90, dtype=np.uint8)[None, :, None], (80, 1, 3))
+    hashes = _dhash(np.stack([ramp, ramp[:, ::-1]]))
+    assert hashes.dtype == np.uint64
+    assert hashes.tolist() == [2**64 - 1, 0]
+
+def test_similarity_matrix():
+    signatures = {
+        0: np.array([0, 0], dtype=np.uint64),
+        2: np.array([2**64 - 1, 0], dtype=np.uint64),
+        5: np.array([2**64 - 1, 2**64 - 1], dtype=np.uint64),
+    }
+    row_of, matrix = similarity_matrix(signatures)
+    assert row_of == {0: 0, 2: 1, 5: 2}
+    assert np.allclose(np.diag(matrix), 1.0)
+    assert np.isclose(matrix[row_of[0], row_of[5]], 0.0)
+    assert np.isclose(matrix[row_of[0], row_of[2]], 0.5)
+    for a in signatures:
+        for b in signatures:
+            assert np.isclose(matrix[row_of[a], row_of[b]], calculate_similarity(signatures[a], signatures[b]))
+
 if __name__ == "__main__":
     run_test_generation() 
\ No newline at end of file
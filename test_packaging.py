@@ -0,0 +1,55 @@
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+from create_zip_package import should_exclude, collect_files
+from create_app_icon import ICNS_TYPES, write_icns
+
+def test_should_exclude():
+    assert should_exclude("src/__pycache__/generator.cpython-311.pyc")
+    assert should_exclude("/repo/.git/config")
+    assert should_exclude("ScrambleClip2.app")
+    assert should_exclude("create_zip_package.py")
+    assert not should_exclude("src/generator.py")
+    assert not should_exclude("assets/input_videos/clip.mp4")
+    assert not should_exclude("README.md")
+
+def test_collect_files():
+    with tempfile.TemporaryDirectory() as root:
+        for name in ("main.py", "src/generator.py", "src/__pycache__/generator.pyc",
+                     "dist/app.dmg", "outputs/notes.txt", ".git/HEAD"):
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+
+        files = sorted(os.path.relpath(path, root) for path in collect_files(root))
+        assert files == ["main.py", os.path.join("outputs", "notes.txt"), os.path.join("src", "generator.py")]
+
+def test_write_icns():
+    with tempfile.TemporaryDirectory() as root:
+        iconset = Path(root)
+        payloads = {"icon_16x16.png": b"sixteen", "icon_512x512@2x.png": b"x" * 1000}
+        for name, data in payloads.items():
+            (iconset / name).write_bytes(data)
+
+        output = iconset / "AppIcon.icns"
+        write_icns(iconset, output)
+        data = output.read_bytes()
+
+        # 'icns' magic and total length, then (type, length, data) per image
+        assert data[:4] == b"icns"
+        assert struct.unpack(">I", data[4:8])[0] == len(data)
+        offset = 8
+        elements = {}
+        while offset < len(data):
+            ostype, length = data[offset:offset + 4], struct.unpack(">I", data[offset + 4:offset + 8])[0]
+            elements[ostype] = data[offset + 8:offset + length]
+            offset += length
+        assert elements == {ICNS_TYPES[name]: payload for name, payload in payloads.items()}
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"{name}: OK")